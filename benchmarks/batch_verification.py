@@ -0,0 +1,84 @@
+"""
+Measure throughput of batch token verification with `decode_cognito_jwts`
+compared to verifying tokens one by one with `decode_cognito_jwt`.
+
+Usage: python benchmarks/batch_verification.py [--tokens 1000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from fastapi_cognito.cognito_jwt.decode import decode_cognito_jwt, \
+    decode_cognito_jwts
+from fastapi_cognito.cognito_jwt.executor import VerificationExecutor
+from fastapi_cognito.cognito_jwt.keys import KeyStore
+from fastapi_cognito.testing import FakeUserpool
+
+# userpool which mints tokens, JWKS is written to temporary file
+userpool = FakeUserpool()
+
+
+async def run(mode, jwks_url, token_list, workers):
+    key_store = KeyStore()
+    await key_store.get_key(jwks_url, userpool.kid)
+    params = dict(
+        region=userpool.region,
+        userpool_id=userpool.userpool_id,
+        app_client_id=userpool.app_client_id,
+        jwks_url=jwks_url,
+        key_store=key_store
+    )
+    executor = None
+    if mode == "batch_thread_pool":
+        executor = VerificationExecutor(max_workers=workers)
+    elif mode == "batch_process_pool":
+        executor = VerificationExecutor(
+            max_workers=workers, use_processes=True
+        )
+
+    start = time.perf_counter()
+    if mode == "single":
+        for token in token_list:
+            await decode_cognito_jwt(token=token, **params)
+    else:
+        results = await decode_cognito_jwts(
+            token_list, executor=executor, **params
+        )
+        assert all(isinstance(result, dict) for result in results)
+    elapsed = time.perf_counter() - start
+
+    if executor is not None:
+        executor.shutdown()
+    return {
+        "tokens_per_second": round(len(token_list) / elapsed),
+        "tokens_per_second_per_core": round(
+            len(token_list) / elapsed / (os.cpu_count() or 1)
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        jwks_url = userpool.write_jwks(f"{tmp_dir}/jwks.json")
+        token_list = [
+            userpool.access_token() for _ in range(args.tokens)
+        ]
+        results = {
+            mode: asyncio.run(run(mode, jwks_url, token_list, args.workers))
+            for mode in (
+                "single", "batch", "batch_thread_pool", "batch_process_pool"
+            )
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Measure event loop lag while tokens are verified with and without
+`VerificationExecutor`.
+
+Usage: python benchmarks/event_loop_lag.py [--tokens 2000] [--concurrency 50]
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import tempfile
+import time
+
+from fastapi_cognito.cognito_jwt.decode import decode_cognito_jwt
+from fastapi_cognito.cognito_jwt.executor import VerificationExecutor
+from fastapi_cognito.cognito_jwt.keys import KeyStore
+from fastapi_cognito.testing import FakeUserpool
+
+# userpool which mints tokens, JWKS is written to temporary file
+userpool = FakeUserpool()
+
+TICK = 0.001
+
+
+async def measure_lag(lags, stop):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - start - TICK)
+
+
+async def run(jwks_url, token_list, concurrency, executor):
+    key_store = KeyStore()
+    await key_store.get_key(jwks_url, userpool.kid)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def decode(token):
+        async with semaphore:
+            await decode_cognito_jwt(
+                token=token,
+                region=userpool.region,
+                userpool_id=userpool.userpool_id,
+                app_client_id=userpool.app_client_id,
+                jwks_url=jwks_url,
+                key_store=key_store,
+                executor=executor
+            )
+
+    lags, stop = [], asyncio.Event()
+    ticker = asyncio.create_task(measure_lag(lags, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(decode(token) for token in token_list))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await ticker
+
+    lags.sort()
+    return {
+        "tokens_per_second": round(len(token_list) / elapsed),
+        "lag_p50_ms": round(statistics.median(lags) * 1000, 3),
+        "lag_p99_ms": round(lags[int(len(lags) * 0.99)] * 1000, 3),
+        "lag_max_ms": round(lags[-1] * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        jwks_url = userpool.write_jwks(f"{tmp_dir}/jwks.json")
+        token_list = [
+            userpool.access_token() for _ in range(args.tokens)
+        ]
+        modes = {
+            "inline": None,
+            "thread_pool": VerificationExecutor(max_workers=args.workers),
+            "process_pool": VerificationExecutor(
+                max_workers=args.workers, use_processes=True
+            ),
+        }
+        results = {}
+        for mode, executor in modes.items():
+            results[mode] = asyncio.run(
+                run(jwks_url, token_list, args.concurrency, executor)
+            )
+            if executor is not None:
+                executor.shutdown()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
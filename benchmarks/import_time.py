@@ -0,0 +1,59 @@
+"""
+Import time benchmark. Each import runs in fresh interpreter, so module caches
+don't affect results. Fails with exit code 1 if modules which should be
+imported lazily are imported with `fastapi_cognito`, or if median import time
+is above `--max-ms`.
+
+Usage: python benchmarks/import_time.py [--runs 10] [--max-ms 1000]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+LAZY_MODULES = ("yaml", "httpx", "aiofile", "multiprocessing")
+
+SCRIPT = f"""
+import json, sys, time
+start = time.perf_counter()
+import fastapi_cognito
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "seconds": elapsed,
+    "lazy_loaded": [m for m in {LAZY_MODULES!r} if m in sys.modules],
+}}))
+"""
+
+
+def measure(module: str = None) -> dict:
+    script = SCRIPT if module is None else SCRIPT.replace(
+        "fastapi_cognito", module
+    )
+    return json.loads(subprocess.check_output([sys.executable, "-c", script]))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--max-ms", type=float, default=1000)
+    args = parser.parse_args()
+
+    runs = [measure() for _ in range(args.runs)]
+    # fastapi is imported by fastapi_cognito, its import time is the baseline
+    baseline = [measure("fastapi")["seconds"] for _ in range(args.runs)]
+    median_ms = statistics.median(run["seconds"] for run in runs) * 1000
+    results = {
+        "import_median_ms": round(median_ms, 1),
+        "fastapi_import_median_ms": round(
+            statistics.median(baseline) * 1000, 1
+        ),
+        "lazy_loaded": runs[0]["lazy_loaded"],
+    }
+    print(json.dumps(results, indent=2))
+    if results["lazy_loaded"] or median_ms > args.max_ms:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Benchmark suite for token verification. Tokens are minted with locally
+generated RSA key and JWKS is read from file, so no network or Cognito is
+needed. Results are written as JSON, so they can be compared between runs.
+
+Usage: python benchmarks/suite.py [--iterations 2000] [--output results.json]
+"""
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+from starlette.requests import Request
+
+from fastapi_cognito import CognitoAuth, CognitoMultiAuth, CognitoSettings
+from fastapi_cognito.cognito_jwt.decode import decode_cognito_jwt
+from fastapi_cognito.cognito_jwt.keys import KeyStore
+from fastapi_cognito.testing import FakeUserpool
+
+# userpool which mints tokens, JWKS is written to temporary file
+userpool = FakeUserpool()
+
+
+def issuer(userpool_id: str) -> str:
+    return f"https://cognito-idp.{userpool.region}.amazonaws.com/{userpool_id}"
+
+
+def create_settings(jwks_url: str, userpools: int) -> CognitoSettings:
+    return CognitoSettings(
+        check_expiration=True,
+        jwt_header_prefix="Bearer",
+        jwt_header_name="Authorization",
+        userpools={
+            f"pool{i}": {
+                "region": userpool.region,
+                "userpool_id": f"{userpool.userpool_id}{i}",
+                "app_client_id": userpool.app_client_id,
+                "jwks_url": jwks_url
+            }
+            for i in range(userpools)
+        }
+    )
+
+
+def create_request(token: str) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(b"authorization", f"Bearer {token}".encode())],
+    })
+
+
+def bad_signature(token: str) -> str:
+    header, payload, signature = token.split(".")
+    return f"{header}.{payload}.{signature[::-1]}"
+
+
+async def measure(
+        call: Callable[[], Awaitable[Any]],
+        iterations: int,
+        expect_error: bool = False
+) -> Dict[str, float]:
+    """
+    Run `call` sequentially and report throughput and latency percentiles.
+    """
+    for _ in range(min(iterations // 10, 100)):
+        try:
+            await call()
+        except Exception:
+            pass
+
+    latencies: List[float] = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        try:
+            await call()
+            failed = False
+        except Exception:
+            failed = True
+        latencies.append(time.perf_counter() - start)
+        if failed != expect_error:
+            raise AssertionError("Unexpected benchmark call result.")
+    return summarize(latencies, sum(latencies))
+
+
+async def measure_concurrent(
+        call: Callable[[], Awaitable[Any]],
+        iterations: int,
+        concurrency: int
+) -> Dict[str, float]:
+    """
+    Run `iterations` calls with `concurrency` calls in flight.
+    """
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed_call():
+        async with semaphore:
+            start = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(timed_call() for _ in range(iterations)))
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def summarize(latencies: List[float], elapsed: float) -> Dict[str, float]:
+    latencies = sorted(latencies)
+    return {
+        "iterations": len(latencies),
+        "ops_per_second": round(len(latencies) / elapsed, 1),
+        "latency_mean_us": round(statistics.mean(latencies) * 1e6, 1),
+        "latency_p50_us": round(latencies[len(latencies) // 2] * 1e6, 1),
+        "latency_p99_us": round(
+            latencies[int(len(latencies) * 0.99)] * 1e6, 1
+        ),
+    }
+
+
+async def run_suite(jwks_url: str, iterations: int) -> Dict[str, Any]:
+    userpool_id = f"{userpool.userpool_id}0"
+    valid_token = userpool.access_token(iss=issuer(userpool_id))
+    expired_token = userpool.access_token(
+        iss=issuer(userpool_id), exp=1
+    )
+    bad_signature_token = bad_signature(valid_token)
+    warm_key_store = KeyStore()
+
+    def decode(token: str, key_store: KeyStore):
+        return decode_cognito_jwt(
+            token=token,
+            region=userpool.region,
+            userpool_id=userpool_id,
+            app_client_id=userpool.app_client_id,
+            jwks_url=jwks_url,
+            key_store=key_store
+        )
+
+    results: Dict[str, Any] = {
+        "decode_cold_cache": await measure(
+            lambda: decode(valid_token, KeyStore()), max(iterations // 10, 1)
+        ),
+        "decode_warm_valid": await measure(
+            lambda: decode(valid_token, warm_key_store), iterations
+        ),
+        "decode_warm_expired": await measure(
+            lambda: decode(expired_token, warm_key_store),
+            iterations,
+            expect_error=True
+        ),
+        "decode_warm_bad_signature": await measure(
+            lambda: decode(bad_signature_token, warm_key_store),
+            iterations,
+            expect_error=True
+        ),
+        "decode_warm_concurrent_100": await measure_concurrent(
+            lambda: decode(valid_token, warm_key_store), iterations, 100
+        ),
+    }
+
+    for userpools in (1, 50):
+        settings = create_settings(jwks_url, userpools)
+        cognito = CognitoAuth(settings=settings, key_store=warm_key_store)
+        multi_cognito = CognitoMultiAuth(
+            settings=settings, key_store=warm_key_store
+        )
+        last_pool_token = userpool.access_token(
+            iss=issuer(f"{userpool.userpool_id}{userpools - 1}")
+        )
+        results[f"auth_required_{userpools}_userpools"] = await measure(
+            lambda: cognito.auth_required(create_request(valid_token)),
+            iterations
+        )
+        results[f"multi_auth_required_{userpools}_userpools"] = await measure(
+            lambda: multi_cognito.auth_required(
+                create_request(last_pool_token)
+            ),
+            iterations
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--output", type=str, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        jwks_url = userpool.write_jwks(f"{tmp_dir}/jwks.json")
+        scenarios = asyncio.run(run_suite(jwks_url, args.iterations))
+
+    results = {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "timestamp": int(time.time()),
+        "scenarios": scenarios,
+    }
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
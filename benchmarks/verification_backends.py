@@ -0,0 +1,68 @@
+"""
+Measure per-token signature verification time of each `VerificationBackend`
+and of full `decode_cognito_jwt` with each backend.
+
+Usage: python benchmarks/verification_backends.py [--iterations 5000]
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+
+from fastapi_cognito.cognito_jwt.backends import JoserfcBackend, RS256Backend
+from fastapi_cognito.cognito_jwt.decode import decode_cognito_jwt
+from fastapi_cognito.cognito_jwt.keys import KeyStore
+from fastapi_cognito.cognito_jwt.utils import ParsedToken
+from fastapi_cognito.testing import FakeUserpool
+
+# userpool which mints tokens, JWKS is written to temporary file
+userpool = FakeUserpool()
+
+
+async def run(jwks_url: str, iterations: int) -> dict:
+    key_store = KeyStore()
+    public_key = await key_store.get_key(jwks_url, userpool.kid)
+    token = userpool.access_token()
+    parsed_token = ParsedToken(token)
+    results = {}
+
+    for backend in (JoserfcBackend(), RS256Backend()):
+        name = type(backend).__name__
+        start = time.perf_counter()
+        for _ in range(iterations):
+            backend.verify(parsed_token, public_key)
+        verify_us = (time.perf_counter() - start) / iterations * 1e6
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await decode_cognito_jwt(
+                token=token,
+                region=userpool.region,
+                userpool_id=userpool.userpool_id,
+                app_client_id=userpool.app_client_id,
+                jwks_url=jwks_url,
+                key_store=key_store,
+                backend=backend
+            )
+        decode_us = (time.perf_counter() - start) / iterations * 1e6
+        results[name] = {
+            "verify_us": round(verify_us, 2),
+            "decode_us": round(decode_us, 2),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        jwks_url = userpool.write_jwks(f"{tmp_dir}/jwks.json")
+        results = asyncio.run(run(jwks_url, args.iterations))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
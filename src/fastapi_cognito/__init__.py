@@ -1,4 +1,10 @@
+from .cache import TokenCache, RejectionCache
+from .cognito_jwt.instrumentation import AuthObserver, MetricsObserver
+from .cognito_jwt.shared_cache import SharedCache
 from .exceptions import CognitoAuthError
-from .fastapi_cognito import CognitoAuth
-from .models import UserpoolModel, CognitoToken
+from .fastapi_cognito import CognitoAuth, CognitoMultiAuth
+from .middleware import CognitoAuthMiddleware
+from .models import UserpoolModel, CognitoToken, CognitoClaims, \
+    TrustedCognitoClaims
 from .settings_parsers import CognitoSettings
+from .websocket import WebSocketSessions
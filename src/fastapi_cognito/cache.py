@@ -0,0 +1,211 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Rough per-entry cost (digest, OrderedDict node, expiry and the token model
+# built from claims) on top of the token itself, which is used as an estimate
+# of the decoded claims size.
+ENTRY_OVERHEAD: int = 1024
+# Rough per-entry cost of rejected token entry on top of failure reason.
+REJECTION_ENTRY_OVERHEAD: int = 256
+# Failure reasons which may not be caused by token itself, e.g. JWKS retrieval
+# failure or key rotation in progress, so they are not cached.
+TRANSIENT_REASONS = frozenset({"jwks_error", "key_error", "unknown_kid"})
+
+
+class TokenCache(object):
+    """
+    Bounded LRU cache of verified tokens. Entries are keyed by SHA-256 digest
+    of the token and `namespace`, so raw tokens are never kept in memory, and
+    expire no later than token `exp` claim.
+
+    `CognitoAuth` uses its own namespace, so cache can be shared between
+    `CognitoAuth` objects and token verified by one of them is never returned
+    to another.
+    """
+
+    def __init__(
+            self,
+            max_entries: int = 10000,
+            max_bytes: Optional[int] = None,
+            ttl: Optional[float] = None
+    ):
+        """
+        Initialization
+        :param max_entries: Maximum number of cached tokens.
+        :param max_bytes: Optional limit of estimated memory used by cached
+         tokens.
+        :param ttl: Optional time in seconds after which entry expires even if
+         token is not expired yet.
+        """
+        if max_entries < 1:
+            raise ValueError("`max_entries` must be greater than 0.")
+        self._max_entries: int = max_entries
+        self._max_bytes: Optional[int] = max_bytes
+        self._ttl: Optional[float] = ttl
+        self._entries: "OrderedDict[bytes, Tuple[float, Any, int]]" = \
+            OrderedDict()
+        self._size: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self.expirations: int = 0
+
+    @staticmethod
+    def digest(token: str, namespace: bytes = b"") -> bytes:
+        """
+        Generate cache key for token
+        :param token: Raw JWT token
+        :param namespace: Namespace of cache entry
+        :return: SHA-256 digest of namespace and token
+        """
+        digest = hashlib.sha256(namespace)
+        digest.update(b"\0")
+        digest.update(token.encode("utf-8"))
+        return digest.digest()
+
+    def get(self, token: str, namespace: bytes = b"") -> Any:
+        """
+        Get cached value for token if present and not expired.
+        :param token: Raw JWT token
+        :param namespace: Namespace of cache entry
+        :return: Cached value or None
+        """
+        key = self.digest(token, namespace)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value, _ = entry
+        if time.time() >= expires_at:
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(
+            self,
+            token: str,
+            value: Any,
+            exp: float,
+            namespace: bytes = b""
+    ) -> None:
+        """
+        Cache value for verified token. Entry expires at token expiration
+        time or after `ttl` if that comes first.
+        :param token: Raw JWT token
+        :param value: Value that should be returned on cache hit
+        :param exp: Token expiration time(`exp` claim)
+        :param namespace: Namespace of cache entry
+        :return: None
+        """
+        now = time.time()
+        expires_at = exp if self._ttl is None else min(exp, now + self._ttl)
+        if expires_at <= now:
+            return
+
+        key = self.digest(token, namespace)
+        size = self._entry_size(token, value)
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (expires_at, value, size)
+        self._size += size
+        self._evict()
+
+    def clear(self) -> None:
+        """
+        Remove all cached entries, statistics are kept.
+        """
+        self._entries.clear()
+        self._size = 0
+
+    @property
+    def size(self) -> int:
+        """
+        Estimated memory in bytes used by cached entries.
+        """
+        return self._size
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """
+        Cache statistics which can be used to size cache against real traffic.
+        """
+        return {
+            "entries": len(self._entries),
+            "size": self._size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _entry_size(token: str, value: Any) -> int:
+        return ENTRY_OVERHEAD + len(token)
+
+    def _remove(self, key: bytes) -> None:
+        _, _, size = self._entries.pop(key)
+        self._size -= size
+
+    def _evict(self) -> None:
+        while len(self._entries) > self._max_entries or (
+            self._max_bytes is not None and self._size > self._max_bytes
+            and len(self._entries) > 1
+        ):
+            _, (_, _, size) = self._entries.popitem(last=False)
+            self._size -= size
+            self.evictions += 1
+
+
+class RejectionCache(TokenCache):
+    """
+    Bounded cache of rejected tokens with short TTL, keyed by SHA-256 digest
+    of the token. Repeatedly sent invalid or expired tokens are rejected
+    without signature verification.
+    """
+
+    def __init__(
+            self,
+            max_entries: int = 10000,
+            max_bytes: Optional[int] = None,
+            ttl: float = 30
+    ):
+        """
+        Initialization
+        :param max_entries: Maximum number of cached rejected tokens.
+        :param max_bytes: Optional limit of estimated memory used by cached
+         rejections.
+        :param ttl: Time in seconds for which token rejection is cached.
+        """
+        super().__init__(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl)
+
+    def set(
+            self,
+            token: str,
+            value: Any,
+            exp: float = float("inf"),
+            namespace: bytes = b""
+    ) -> None:
+        """
+        Cache failure for rejected token for `ttl` seconds.
+        :param token: Raw JWT token
+        :param value: Failure which should be returned on cache hit
+        :param exp: Optional time when entry should expire
+        :param namespace: Namespace of cache entry
+        :return: None
+        """
+        super().set(token, value, exp, namespace)
+
+    @staticmethod
+    def _entry_size(token: str, value: Any) -> int:
+        return REJECTION_ENTRY_OVERHEAD + len(str(value))
@@ -0,0 +1,85 @@
+from abc import ABC, abstractmethod
+from typing import Dict
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives.asymmetric.padding import PKCS1v15
+from cryptography.hazmat.primitives.hashes import SHA256
+from joserfc import jwk
+
+from fastapi_cognito.cognito_jwt.exceptions import CognitoJWTException
+from fastapi_cognito.cognito_jwt.utils import verify_signature, ParsedToken
+
+
+class VerificationBackend(ABC):
+    """
+    Base class for signature verification backends. Backend verifies token
+    signature with public key from `KeyStore` and returns unverified claims
+    only if signature is valid. Backends are used from thread and process
+    pools, so they should be stateless.
+
+    Failures are raised as `CognitoJWTException` with the same reasons in all
+    backends: `malformed` for unsupported header or algorithm which doesn't
+    match key type and `bad_signature` for key which can't be used for
+    verification or invalid signature. Subclass must implement `verify`,
+    otherwise it can't be instantiated.
+    """
+
+    @abstractmethod
+    def verify(self, token: ParsedToken, public_key: jwk.Key) -> Dict:
+        """
+        Verify JWT signature with public key and decode token claims.
+
+        :return: Dict with token claims.
+        """
+
+
+class JoserfcBackend(VerificationBackend):
+    """
+    Default backend, verifies signature with any algorithm recommended by
+    `joserfc`.
+    """
+
+    def verify(self, token: ParsedToken, public_key: jwk.Key) -> Dict:
+        return verify_signature(token, public_key)
+
+
+class RS256Backend(VerificationBackend):
+    """
+    Backend which supports only RS256, algorithm used by Cognito. Signature is
+    verified directly with `cryptography` public key which `joserfc` extracts
+    once, when JWKS is imported, so JOSE algorithm registry and key wrappers
+    are skipped for each token.
+    """
+
+    def verify(self, token: ParsedToken, public_key: jwk.Key) -> Dict:
+        header = token.header
+        if header.get("alg") != "RS256":
+            raise CognitoJWTException(
+                "Unsupported token algorithm.", "malformed"
+            )
+        if "crit" in header:
+            raise CognitoJWTException(
+                "Unsupported critical header parameters.", "malformed"
+            )
+        if not isinstance(public_key, jwk.RSAKey):
+            raise CognitoJWTException(
+                "Unsupported token algorithm.", "malformed"
+            )
+        if public_key.get("alg", "RS256") != "RS256" or \
+                public_key.get("use", "sig") != "sig":
+            raise CognitoJWTException(
+                "Public key can't be used to verify token.", "bad_signature"
+            )
+
+        try:
+            public_key.public_key.verify(
+                token.signature, token.signing_input, PKCS1v15(), SHA256()
+            )
+        except InvalidSignature:
+            raise CognitoJWTException(
+                "Token signature verification failed.", "bad_signature"
+            )
+        return token.unverified_claims
+
+
+default_backend = JoserfcBackend()
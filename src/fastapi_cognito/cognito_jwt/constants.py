@@ -1 +1,2 @@
-PUBLIC_KEYS_URL_TEMPLATE = 'https://cognito-idp.{}.amazonaws.com/{}/.well-known/jwks.json'
\ No newline at end of file
+PUBLIC_KEYS_URL_TEMPLATE = 'https://cognito-idp.{}.amazonaws.com/{}/.well-known/jwks.json'
+ISSUER_URL_TEMPLATE = 'https://cognito-idp.{}.amazonaws.com/{}'
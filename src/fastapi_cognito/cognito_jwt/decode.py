@@ -1,111 +1,275 @@
-import json
-import logging
+import asyncio
 import os
-from typing import Dict, Container, Optional, Union, List, Mapping
+from typing import Dict, Container, Optional, Union, Iterable, List
 
-import httpx
-from aiofile import AIOFile
-from async_lru import alru_cache
-from joserfc import jwk, jwt
-from joserfc.errors import BadSignatureError
+from joserfc import jwk
 
-from fastapi_cognito.cognito_jwt.constants import PUBLIC_KEYS_URL_TEMPLATE
-from fastapi_cognito.cognito_jwt.exceptions import CognitoJWTException
+from fastapi_cognito.cognito_jwt.backends import VerificationBackend, \
+    default_backend
+from fastapi_cognito.cognito_jwt.constants import PUBLIC_KEYS_URL_TEMPLATE, \
+    ISSUER_URL_TEMPLATE
+from fastapi_cognito.cognito_jwt.executor import VerificationExecutor
+from fastapi_cognito.cognito_jwt.instrumentation import AuthObserver, \
+    StageTimer, STAGE_PARSE, STAGE_KEY, STAGE_VERIFY, STAGE_CLAIMS
+from fastapi_cognito.cognito_jwt.keys import KeyStore, default_key_store
+from fastapi_cognito.cognito_jwt.revocation import RevocationList
 from fastapi_cognito.cognito_jwt.utils import check_expired, check_client_id, \
-    get_unverified_token_header
+    check_issuer, parse_token, ParsedToken
 
-logger = logging.getLogger(__name__)
 
+def get_jwks_url(
+        region: str,
+        userpool_id: str,
+        jwks_url: Optional[str] = None
+) -> str:
+    """
+    Resolve JWKS URL for userpool. Prioritise `jwks_url` userpool
+    configuration, then `AWS_COGNITO_KEYS_URL` environment variable and use
+    default Cognito JWKS URL if none of them is set.
 
-@alru_cache(maxsize=10)
-async def __get_keys_async(keys_url: str) -> List[dict]:
+    :return: JWKS URL or path
     """
-    Retrieves public keys from AWS Cognito or read from file
+    return (
+        jwks_url or
+        os.environ.get("AWS_COGNITO_KEYS_URL") or
+        PUBLIC_KEYS_URL_TEMPLATE.format(region, userpool_id)
+    )
+
 
-    :return: List of public keys
+def get_issuer_url(
+        region: str,
+        userpool_id: str,
+        issuer: Optional[str] = None
+) -> str:
     """
-    try:
-        if keys_url.startswith("http"):
-            async with httpx.AsyncClient() as client:
-                response = await client.get(keys_url)
-                data = response.json()
-        else:
-            async with AIOFile(keys_url, 'r') as afp:
-                f = await afp.read()
-                data = json.loads(f)
-        return data.get('keys')
-    except Exception as e:
-        logger.error(
-            f"ERROR: Following error occurred while retrieving jwks from "
-            f"`{keys_url}`: {e} - "
-            f"Check if your configuration `settings.jwks_url` or "
-            f"`AWS_COGNITO_KEYS_URL` environment variable is correct."
-        )
-        raise CognitoJWTException("Failed to decode JWT token.")
+    Resolve issuer(`iss` claim) URL for userpool. Use `issuer` userpool
+    configuration if set, else default Cognito issuer URL.
 
+    :return: Issuer URL
+    """
+    return issuer or ISSUER_URL_TEMPLATE.format(region, userpool_id)
 
-async def __get_public_key_async(
-        token: str,
+
+def __get_prescreen_issuer(
         region: str,
         userpool_id: str,
-        jwks_url: Optional[str] = None
-):
+        jwks_url: Optional[str] = None,
+        issuer: Optional[str] = None
+) -> Optional[str]:
     """
-    Get public key, verify that `kid` value matches value from token headers
-    and generate `joserfc._keys.Key` object
+    Resolve issuer which unverified claims are screened against. Without
+    configured `issuer`, default Cognito issuer is screened only if keys are
+    retrieved from default Cognito JWKS URL, because every token signed with
+    those keys is issued by that userpool. Tokens verified with custom JWKS,
+    e.g. from emulator, are not screened by issuer.
 
-    :return: `joserfc._keys.Key`
+    :return: Issuer URL or None
     """
-    if not jwks_url:
-        jwks_url: str = (
-            os.environ.get("AWS_COGNITO_KEYS_URL") or
-            PUBLIC_KEYS_URL_TEMPLATE.format(region, userpool_id)
-        )
-    keys: list = await __get_keys_async(jwks_url)
+    if issuer:
+        return issuer
+    if get_jwks_url(region, userpool_id, jwks_url) == \
+            PUBLIC_KEYS_URL_TEMPLATE.format(region, userpool_id):
+        return ISSUER_URL_TEMPLATE.format(region, userpool_id)
+    return None
 
-    headers: Mapping[str, str] = get_unverified_token_header(token)
-    kid: str = headers["kid"]
 
-    key = list(filter(lambda k: k["kid"] == kid, keys))
-    if not key:
-        raise CognitoJWTException(
-            "Public key not found, check userpool configuration."
-        )
-    else:
-        key = key[0]
+async def __get_public_key_async(
+        token: ParsedToken,
+        region: str,
+        userpool_id: str,
+        jwks_url: Optional[str] = None,
+        key_store: Optional[KeyStore] = None,
+        observer: Optional[AuthObserver] = None
+) -> jwk.Key:
+    """
+    Get public key which `kid` value matches value from token headers from
+    `KeyStore` where keys are already imported.
+
+    :return: `joserfc.jwk.Key`
+    """
+    jwks_url: str = get_jwks_url(region, userpool_id, jwks_url)
 
-    return jwk.JWKRegistry.import_key(key)
+    kid: str = token.kid
+
+    return await (key_store or default_key_store).get_key(
+        jwks_url, kid, observer
+    )
 
 
 async def decode_cognito_jwt(
-        token: str,
+        token: Union[str, ParsedToken],
         region: str,
         userpool_id: str,
         app_client_id: Optional[Union[str, Container[str]]] = None,
         testmode: bool = False,
         jwks_url: Optional[str] = None,
+        key_store: Optional[KeyStore] = None,
+        executor: Optional[VerificationExecutor] = None,
+        issuer: Optional[str] = None,
+        observer: Optional[AuthObserver] = None,
+        prescreen: bool = False,
+        backend: VerificationBackend = default_backend,
+        revocation_list: Optional[RevocationList] = None,
 ) -> Dict:
     """
     Retrieve public key, decode and validate JWT. Check if token is issued
-     for provided `app_client_id` and if it's expired.
+     for provided `app_client_id` and if it's expired. If `issuer` is provided,
+     check if token is issued by that issuer. If `executor` is provided,
+     signature verification is offloaded from event loop. If `observer` is
+     provided, duration of each stage is reported to it. If `prescreen` is
+     enabled, the same checks run on unverified claims before key retrieval
+     and signature verification, so tokens which would be rejected anyway
+     are rejected without crypto work. Without `issuer`, prescreen checks
+     default Cognito issuer if keys come from default Cognito JWKS URL.
+     Checks always run on verified claims.
+     Signature is verified with `backend`, `JoserfcBackend` by default. If
+     `revocation_list` is provided, token with revoked `jti` or `origin_jti`
+     is rejected.
 
     :return: Dict with token claims.
     """
+    timer = StageTimer(observer) if observer is not None else None
+    parsed_token = parse_token(token)
+    if prescreen:
+        __check_claims(
+            parsed_token.unverified_claims,
+            app_client_id=app_client_id,
+            testmode=testmode,
+            issuer=__get_prescreen_issuer(
+                region, userpool_id, jwks_url, issuer
+            )
+        )
+    if timer:
+        timer.stage(STAGE_PARSE)
+
     public_key = await __get_public_key_async(
-        token=token, region=region, userpool_id=userpool_id, jwks_url=jwks_url
+        token=parsed_token,
+        region=region,
+        userpool_id=userpool_id,
+        jwks_url=jwks_url,
+        key_store=key_store,
+        observer=observer
     )
+    if timer:
+        timer.stage(STAGE_KEY)
 
-    try:
-        decoded_claims = jwt.decode(token, public_key)
-    except BadSignatureError:
-        raise CognitoJWTException(
-            "Token signature verification failed."
+    if executor is None:
+        claims = backend.verify(parsed_token, public_key)
+    else:
+        claims = await executor.verify(parsed_token, public_key, backend)
+    if timer:
+        timer.stage(STAGE_VERIFY)
+
+    __check_claims(
+        claims, app_client_id=app_client_id, testmode=testmode, issuer=issuer
+    )
+    if revocation_list is not None:
+        revocation_list.check(claims)
+    if timer:
+        timer.stage(STAGE_CLAIMS)
+    return claims
+
+
+async def decode_cognito_jwts(
+        tokens: Iterable[Union[str, ParsedToken]],
+        region: str,
+        userpool_id: str,
+        app_client_id: Optional[Union[str, Container[str]]] = None,
+        testmode: bool = False,
+        jwks_url: Optional[str] = None,
+        key_store: Optional[KeyStore] = None,
+        executor: Optional[VerificationExecutor] = None,
+        issuer: Optional[str] = None,
+        prescreen: bool = False,
+        backend: VerificationBackend = default_backend,
+        revocation_list: Optional[RevocationList] = None,
+) -> List[Union[Dict, Exception]]:
+    """
+    Decode and validate batch of JWTs issued by the same userpool. Public key
+     for each `kid` is resolved once and tokens are verified concurrently if
+     `executor` is provided. Failure of a single token doesn't stop
+     verification of others. `prescreen`, `backend` and `revocation_list` work
+     the same as in `decode_cognito_jwt`.
+
+    :return: List with token claims or exception for each token, in the same
+     order as `tokens`.
+    """
+    jwks_url: str = get_jwks_url(region, userpool_id, jwks_url)
+    key_store: KeyStore = key_store or default_key_store
+
+    prescreen_issuer: Optional[str] = __get_prescreen_issuer(
+        region, userpool_id, jwks_url, issuer
+    )
+    results: List[Union[Dict, Exception, ParsedToken]] = []
+    for token in tokens:
+        try:
+            parsed_token = parse_token(token)
+            if prescreen:
+                __check_claims(
+                    parsed_token.unverified_claims,
+                    app_client_id=app_client_id,
+                    testmode=testmode,
+                    issuer=prescreen_issuer
+                )
+            results.append(parsed_token)
+        except Exception as error:
+            results.append(error)
+
+    # only tokens which parsed cleanly are in results, so each has `str` kid
+    kids = list({
+        token.kid for token in results if isinstance(token, ParsedToken)
+    })
+    keys = await asyncio.gather(
+        *(key_store.get_key(jwks_url, kid) for kid in kids),
+        return_exceptions=True
+    )
+    public_keys = dict(zip(kids, keys))
+
+    async def verify(token: ParsedToken) -> Dict:
+        public_key = public_keys[token.kid]
+        if isinstance(public_key, Exception):
+            raise public_key
+        if executor is None:
+            claims = backend.verify(token, public_key)
+        else:
+            claims = await executor.verify(token, public_key, backend)
+        __check_claims(
+            claims,
+            app_client_id=app_client_id,
+            testmode=testmode,
+            issuer=issuer
         )
+        if revocation_list is not None:
+            revocation_list.check(claims)
+        return claims
+
+    verified = iter(await asyncio.gather(
+        *(
+            verify(token) for token in results
+            if isinstance(token, ParsedToken)
+        ),
+        return_exceptions=True
+    ))
+    return [
+        next(verified) if isinstance(result, ParsedToken) else result
+        for result in results
+    ]
+
 
-    claims = decoded_claims.claims
-    check_expired(claims["exp"], testmode=testmode)
+def __check_claims(
+        claims: Dict,
+        app_client_id: Optional[Union[str, Container[str]]] = None,
+        testmode: bool = False,
+        issuer: Optional[str] = None
+) -> None:
+    """
+    Check if verified token is expired and if it's issued by provided
+     `issuer` for provided `app_client_id`.
+    """
+    check_expired(claims.get("exp"), testmode=testmode)
+
+    if issuer:
+        check_issuer(claims, issuer)
 
     if app_client_id:
         check_client_id(claims, app_client_id)
-
-    return claims
@@ -1,2 +1,11 @@
 class CognitoJWTException(Exception):
-    pass
+    """
+    Raised when token can't be decoded or validated. `reason` describes
+    failure category, e.g. `expired` or `bad_signature`.
+    """
+    def __init__(self, message: str = "", reason: str = "invalid_token"):
+        super().__init__(message)
+        self.reason: str = reason
+
+    def __reduce__(self):
+        return self.__class__, (str(self), self.reason)
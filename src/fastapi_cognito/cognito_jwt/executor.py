@@ -0,0 +1,135 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from joserfc import jwk
+
+from fastapi_cognito.cognito_jwt.backends import VerificationBackend, \
+    default_backend
+from fastapi_cognito.cognito_jwt.utils import ParsedToken
+
+# Keys imported in process pool workers, imported keys can't be pickled so
+# workers receive JWK dicts and import each key once.
+__worker_keys: Dict[Tuple[str, str], jwk.Key] = {}
+
+
+def _verify_with_jwk(
+        token: ParsedToken,
+        key_dict: Dict,
+        backend: VerificationBackend
+) -> Dict:
+    """
+    Verify token in process pool worker with public key in JWK format.
+
+    :return: Dict with token claims.
+    """
+    key_id = (key_dict.get("kid"), key_dict.get("n"))
+    public_key = __worker_keys.get(key_id)
+    if public_key is None:
+        public_key = jwk.JWKRegistry.import_key(key_dict)
+        __worker_keys[key_id] = public_key
+    return backend.verify(token, public_key)
+
+
+class VerificationExecutor(object):
+    """
+    Runs CPU bound signature verification in thread or process pool, so it
+    doesn't block event loop under load.
+
+    When there is no verification running in the pool and less than
+    `inline_threshold` verifications were started in last `inline_window`
+    seconds, verification runs inline on event loop to avoid pool overhead
+    for idle applications.
+    """
+
+    def __init__(
+            self,
+            max_workers: Optional[int] = None,
+            use_processes: bool = False,
+            executor: Optional[Executor] = None,
+            inline_threshold: int = 1,
+            inline_window: float = 0.01
+    ):
+        """
+        Initialization
+        :param max_workers: Number of pool workers.
+        :param use_processes: Use process pool instead of thread pool.
+        :param executor: Optional executor which should be used instead of
+         creating new pool. Executor provided this way is not shut down by
+         `shutdown`.
+        :param inline_threshold: Number of verifications per `inline_window`
+         which run inline, set to 0 to always use pool.
+        :param inline_window: Time window in seconds for `inline_threshold`.
+        """
+        self._use_processes: bool = use_processes
+        if executor is not None or use_processes:
+            # imported only when needed, it imports `multiprocessing`
+            from concurrent.futures import ProcessPoolExecutor
+            self._use_processes = use_processes or isinstance(
+                executor, ProcessPoolExecutor
+            )
+        if executor is not None:
+            self._executor: Executor = executor
+        elif use_processes:
+            self._executor = ProcessPoolExecutor(max_workers=max_workers)
+        else:
+            self._executor = ThreadPoolExecutor(
+                max_workers=max_workers,
+                thread_name_prefix="fastapi-cognito-verify"
+            )
+        self._owns_executor: bool = executor is None
+        self._inline_threshold: int = inline_threshold
+        self._inline_window: float = inline_window
+        self._window_start: float = 0.0
+        self._window_count: int = 0
+        self._in_flight: int = 0
+
+    async def verify(
+            self,
+            token: ParsedToken,
+            public_key: jwk.Key,
+            backend: VerificationBackend = default_backend
+    ) -> Dict:
+        """
+        Verify JWT signature with public key and decode token claims.
+
+        :return: Dict with token claims.
+        """
+        if self._run_inline():
+            return backend.verify(token, public_key)
+
+        loop = asyncio.get_running_loop()
+        self._in_flight += 1
+        try:
+            if self._use_processes:
+                return await loop.run_in_executor(
+                    self._executor,
+                    _verify_with_jwk,
+                    token,
+                    public_key.as_dict(private=False),
+                    backend
+                )
+            return await loop.run_in_executor(
+                self._executor, backend.verify, token, public_key
+            )
+        finally:
+            self._in_flight -= 1
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Shut down pool if it is created by `VerificationExecutor`.
+        """
+        if self._owns_executor:
+            self._executor.shutdown(wait=wait)
+
+    def _run_inline(self) -> bool:
+        now = time.monotonic()
+        if now - self._window_start >= self._inline_window:
+            self._window_start = now
+            self._window_count = 0
+        self._window_count += 1
+        return (
+            self._in_flight == 0 and
+            self._window_count <= self._inline_threshold
+        )
@@ -0,0 +1,211 @@
+import time
+from collections import defaultdict
+from typing import Dict, List, Sequence, Tuple
+
+# Stages reported with `AuthObserver.on_stage`
+STAGE_HEADER = "header"
+STAGE_PARSE = "parse"
+STAGE_KEY = "key"
+STAGE_VERIFY = "verify"
+STAGE_CLAIMS = "claims"
+STAGE_MODEL = "model"
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+)
+
+
+class AuthObserver(object):
+    """
+    Base class for authentication observers. All methods are no-op, subclass
+    should override methods for events it is interested in. Observers are
+    called on event loop, so they should be fast and non-blocking.
+    """
+
+    def on_stage(self, stage: str, duration: float) -> None:
+        """
+        Called when authentication stage is finished.
+        :param stage: Stage name, one of `STAGE_*` constants
+        :param duration: Stage duration in seconds
+        """
+
+    def on_jwks_fetch(
+            self,
+            keys_url: str,
+            duration: float,
+            success: bool
+    ) -> None:
+        """
+        Called when JWKS retrieval is finished.
+        :param keys_url: JWKS URL or path
+        :param duration: Retrieval duration in seconds
+        :param success: If JWKS is successfully retrieved and imported
+        """
+
+    def on_cache(self, cache: str, hit: bool) -> None:
+        """
+        Called on each cache lookup.
+        :param cache: Cache name, e.g. `token` or `jwks`
+        :param hit: If lookup was a hit
+        """
+
+    def on_failure(self, reason: str) -> None:
+        """
+        Called when authentication fails.
+        :param reason: Failure category, `CognitoJWTException.reason`,
+         header error(`missing_header`, `invalid_header`) or authorization
+         error(`insufficient_scope`, `insufficient_groups`)
+        """
+
+
+class StageTimer(object):
+    """
+    Measures consecutive stages and reports them to observer.
+    """
+    __slots__ = ("observer", "last")
+
+    def __init__(self, observer: AuthObserver):
+        self.observer: AuthObserver = observer
+        self.last: float = time.perf_counter()
+
+    def stage(self, stage: str) -> None:
+        now = time.perf_counter()
+        self.observer.on_stage(stage, now - self.last)
+        self.last = now
+
+
+class Histogram(object):
+    """
+    Cumulative histogram with fixed buckets.
+    """
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets))
+        self.counts: List[int] = [0] * len(self.buckets)
+        self.count: int = 0
+        self.sum: float = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+class MetricsObserver(AuthObserver):
+    """
+    Observer which collects Prometheus style counters and histograms and
+    renders them in Prometheus text exposition format with `render`.
+    """
+
+    def __init__(
+            self,
+            prefix: str = "fastapi_cognito",
+            buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        """
+        Initialization
+        :param prefix: Prefix of metric names
+        :param buckets: Upper bounds of histogram buckets in seconds
+        """
+        self._prefix: str = prefix
+        self._buckets: Sequence[float] = buckets
+        self.stage_duration: Dict[str, Histogram] = {}
+        self.jwks_fetch_duration: Histogram = Histogram(buckets)
+        self.jwks_fetches: Dict[str, int] = defaultdict(int)
+        self.cache_lookups: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.failures: Dict[str, int] = defaultdict(int)
+
+    def on_stage(self, stage: str, duration: float) -> None:
+        histogram = self.stage_duration.get(stage)
+        if histogram is None:
+            histogram = self.stage_duration[stage] = Histogram(self._buckets)
+        histogram.observe(duration)
+
+    def on_jwks_fetch(
+            self,
+            keys_url: str,
+            duration: float,
+            success: bool
+    ) -> None:
+        self.jwks_fetches["success" if success else "error"] += 1
+        self.jwks_fetch_duration.observe(duration)
+
+    def on_cache(self, cache: str, hit: bool) -> None:
+        self.cache_lookups[(cache, "hit" if hit else "miss")] += 1
+
+    def on_failure(self, reason: str) -> None:
+        self.failures[reason] += 1
+
+    def cache_hit_ratio(self, cache: str) -> float:
+        """
+        :return: Ratio of hits for cache lookups, 0 if there were no lookups
+        """
+        hits = self.cache_lookups.get((cache, "hit"), 0)
+        total = hits + self.cache_lookups.get((cache, "miss"), 0)
+        return hits / total if total else 0.0
+
+    def render(self) -> str:
+        """
+        :return: Metrics in Prometheus text exposition format
+        """
+        prefix = self._prefix
+        lines: List[str] = [
+            f"# TYPE {prefix}_stage_duration_seconds histogram"
+        ]
+        for stage, histogram in sorted(self.stage_duration.items()):
+            lines.extend(self._render_histogram(
+                f"{prefix}_stage_duration_seconds",
+                f'stage="{stage}"',
+                histogram
+            ))
+        lines.append(f"# TYPE {prefix}_jwks_fetch_duration_seconds histogram")
+        lines.extend(self._render_histogram(
+            f"{prefix}_jwks_fetch_duration_seconds",
+            "",
+            self.jwks_fetch_duration
+        ))
+        lines.append(f"# TYPE {prefix}_jwks_fetches_total counter")
+        for result, count in sorted(self.jwks_fetches.items()):
+            lines.append(
+                f'{prefix}_jwks_fetches_total{{result="{result}"}} {count}'
+            )
+        lines.append(f"# TYPE {prefix}_cache_lookups_total counter")
+        for (cache, result), count in sorted(self.cache_lookups.items()):
+            lines.append(
+                f'{prefix}_cache_lookups_total'
+                f'{{cache="{cache}",result="{result}"}} {count}'
+            )
+        lines.append(f"# TYPE {prefix}_failures_total counter")
+        for reason, count in sorted(self.failures.items()):
+            lines.append(
+                f'{prefix}_failures_total{{reason="{reason}"}} {count}'
+            )
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_histogram(
+            name: str,
+            labels: str,
+            histogram: Histogram
+    ) -> List[str]:
+        separator = "," if labels else ""
+        lines = []
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            lines.append(
+                f'{name}_bucket{{{labels}{separator}le="{bound}"}} '
+                f'{cumulative}'
+            )
+        lines.append(
+            f'{name}_bucket{{{labels}{separator}le="+Inf"}} {histogram.count}'
+        )
+        label_set = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{label_set} {histogram.sum}")
+        lines.append(f"{name}_count{label_set} {histogram.count}")
+        return lines
@@ -0,0 +1,735 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Iterable, Tuple, Callable, \
+    TYPE_CHECKING
+
+from joserfc import jwk
+
+from fastapi_cognito.cognito_jwt.exceptions import CognitoJWTException
+from fastapi_cognito.cognito_jwt.instrumentation import AuthObserver
+from fastapi_cognito.cognito_jwt.shared_cache import SharedCache
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+# Rough memory cost of single imported RSA key(`joserfc` key and
+# `cryptography` public key) on top of its JWK representation.
+KEY_OVERHEAD: int = 1536
+EVICTION_POLICIES = ("lru", "lfu")
+
+
+class KeySet(object):
+    """
+    Public keys from single JWKS, imported once and indexed by `kid`.
+    """
+    __slots__ = ("jwks", "keys", "fetched_at", "size", "lookups")
+
+    def __init__(self, jwks: List[dict], fetched_at: Optional[float] = None):
+        """
+        Initialization
+        :param jwks: List of keys from JWKS `keys` field
+        :param fetched_at: Timestamp when JWKS was retrieved, defaults to
+         current time.
+        """
+        self.jwks: List[dict] = jwks
+        self.keys: Dict[str, jwk.Key] = {
+            key["kid"]: jwk.JWKRegistry.import_key(key) for key in jwks
+        }
+        self.fetched_at: float = (
+            time.time() if fetched_at is None else fetched_at
+        )
+        # estimated memory used by keys
+        self.size: int = sum(
+            len(json.dumps(key)) + KEY_OVERHEAD for key in jwks
+        )
+        # lookups since load, used by `lfu` eviction of bounded `KeyStore`
+        self.lookups: int = 0
+
+    def get(self, kid: str) -> Optional[jwk.Key]:
+        return self.keys.get(kid)
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+
+class PoolStats(object):
+    """
+    Statistics of single JWKS URL(userpool) in `KeyStore`.
+    """
+    __slots__ = ("lookups", "fetches", "fetch_errors", "unknown_kid",
+                 "evictions")
+
+    def __init__(self):
+        self.lookups: int = 0
+        self.fetches: int = 0
+        self.fetch_errors: int = 0
+        self.unknown_kid: int = 0
+        self.evictions: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class KeyStore(object):
+    """
+    Holds `KeySet` per JWKS URL. JWKS is retrieved and imported once, so
+    lookup of key for token is a single dict lookup.
+
+    Keys are refreshed in background when they get older than
+    `max_age - refresh_before` seconds, while stale keys are still served.
+    If refresh keeps failing, stale keys are served without limit unless
+    `max_stale` is set. Keys older than `max_age + max_stale` seconds are not
+    served, lookup waits for retrieval and fails if it fails, so key removed
+    from JWKS is not trusted for longer than that while endpoint is down.
+    Token with unknown `kid` triggers refetch of JWKS, at most once per
+    `min_refetch_interval` seconds per JWKS URL, so rotated keys are picked up
+    without restart.
+
+    Concurrent retrievals of the same JWKS are coalesced, so there is at most
+    one outstanding fetch per JWKS URL and all waiters get its result.
+
+    JWKS is retrieved with single pooled `httpx.AsyncClient`, created on first
+    use or on `startup` and closed on `shutdown`. Pooled connections belong to
+    event loop which created them, so client, pending retrievals and
+    background refreshes are bound to running event loop and created again
+    when `KeyStore` is used from new event loop, e.g. when each invocation
+    runs its own `asyncio.run`.
+
+    If `snapshot_path` is set, loaded keys are written to that file on
+    `warmup` and `shutdown` and read from it on `startup`, so keys are
+    available before JWKS endpoint responds.
+
+    JWKS read from file is not refreshed by age. Instead, file is checked with
+    `os.stat` at most once per `file_poll_interval` seconds and keys are
+    re-imported only if file modification time, inode or size changed. New
+    `KeySet` is fully imported before it replaces old one, so requests never
+    see partially loaded keys.
+
+    Number of loaded JWKS can be limited with `max_pools` and estimated
+    memory of imported keys with `max_bytes`, least recently(`lru`) or least
+    frequently(`lfu`) used JWKS is evicted when limit is exceeded and
+    retrieved again on next use. `lfu` counts lookups since JWKS was loaded,
+    count is halved on each refresh, so JWKS which was popular long ago is not
+    kept forever and reloaded JWKS doesn't inherit lookups from before its
+    eviction. `lfu` eviction scans all loaded JWKS, so it costs O(max_pools)
+    per evicted JWKS, while `lru` eviction is O(1). Statistics for each JWKS
+    URL are available through `pool_stats`.
+
+    If `shared_cache` is set, JWKS is shared with other worker processes on
+    the host. JWKS retrieved by any worker is loaded from `shared_cache`
+    instead of being retrieved again, so there is one retrieval per host.
+    """
+
+    def __init__(
+            self,
+            max_age: float = 3600,
+            refresh_before: float = 300,
+            min_refetch_interval: float = 30,
+            max_stale: Optional[float] = None,
+            http_client: Optional["httpx.AsyncClient"] = None,
+            connect_timeout: float = 5,
+            read_timeout: float = 5,
+            max_connections: int = 10,
+            max_keepalive_connections: int = 5,
+            keepalive_expiry: float = 60,
+            snapshot_path: Optional[str] = None,
+            shared_cache: Optional[SharedCache] = None,
+            file_poll_interval: float = 1,
+            max_pools: Optional[int] = None,
+            max_bytes: Optional[int] = None,
+            eviction: str = "lru"
+    ):
+        """
+        Initialization
+        :param max_age: Time in seconds for which retrieved JWKS is fresh.
+        :param refresh_before: Time in seconds before `max_age` is reached
+         when background refresh should start.
+        :param min_refetch_interval: Minimal time in seconds between two
+         retrievals of the same JWKS caused by unknown `kid` or failed
+         refresh.
+        :param max_stale: Optional time in seconds after `max_age` for which
+         stale keys are served when they can't be refreshed.
+        :param http_client: Optional client which should be used to retrieve
+         JWKS. Client provided this way is not closed on `shutdown` and
+         other HTTP params are ignored.
+        :param connect_timeout: Timeout in seconds for establishing connection.
+        :param read_timeout: Timeout in seconds for reading response.
+        :param max_connections: Maximum number of open connections.
+        :param max_keepalive_connections: Maximum number of idle connections
+         kept alive.
+        :param keepalive_expiry: Time in seconds after which idle connection
+         is closed.
+        :param snapshot_path: Optional path of local JWKS snapshot file.
+        :param shared_cache: Optional `SharedCache` used to share JWKS between
+         worker processes.
+        :param file_poll_interval: Minimal time in seconds between two checks
+         of JWKS file for changes.
+        :param max_pools: Optional maximum number of loaded JWKS.
+        :param max_bytes: Optional limit of estimated memory used by imported
+         keys.
+        :param eviction: Eviction policy when limit is exceeded, `lru` or
+         `lfu`.
+        """
+        if eviction not in EVICTION_POLICIES:
+            raise ValueError(
+                f"`eviction` must be one of: {', '.join(EVICTION_POLICIES)}."
+            )
+        self._max_age: float = max_age
+        self._refresh_before: float = refresh_before
+        self._min_refetch_interval: float = min_refetch_interval
+        self._max_stale: Optional[float] = max_stale
+        self._key_sets: "OrderedDict[str, KeySet]" = OrderedDict()
+        self._size: int = 0
+        self._max_pools: Optional[int] = max_pools
+        self._max_bytes: Optional[int] = max_bytes
+        self._bounded: bool = max_pools is not None or max_bytes is not None
+        self._eviction: str = eviction
+        self._stats: Dict[str, PoolStats] = {}
+        self._last_fetch: Dict[str, float] = {}
+        self._refresh_tasks: Dict[str, asyncio.Task] = {}
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._http_client: Optional["httpx.AsyncClient"] = http_client
+        self._http_client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._owns_http_client: bool = http_client is None
+        self._connect_timeout: float = connect_timeout
+        self._read_timeout: float = read_timeout
+        self._max_connections: int = max_connections
+        self._max_keepalive_connections: int = max_keepalive_connections
+        self._keepalive_expiry: float = keepalive_expiry
+        self._snapshot_path: Optional[str] = snapshot_path
+        self._shared_cache: Optional[SharedCache] = shared_cache
+        self._file_poll_interval: float = file_poll_interval
+        self._file_versions: Dict[str, Tuple[int, int, int]] = {}
+        self._last_stat: Dict[str, float] = {}
+        self._sources: Dict[str, Callable[[], List[dict]]] = {}
+        self._observers: List[AuthObserver] = []
+
+    def add_observer(self, observer: AuthObserver) -> None:
+        """
+        Register observer which is notified about all JWKS retrievals and key
+        lookups of this `KeyStore`. Observer which should receive only events
+        caused by its own lookups, e.g. observer of single `CognitoAuth`,
+        should be passed to `get_key` instead.
+        """
+        if observer not in self._observers:
+            self._observers.append(observer)
+
+    def _get_observers(
+            self,
+            observer: Optional[AuthObserver]
+    ) -> List[AuthObserver]:
+        """
+        :return: Registered observers and `observer` of current call
+        """
+        if observer is None or observer in self._observers:
+            return self._observers
+        return self._observers + [observer]
+
+    async def startup(self) -> None:
+        """
+        Create HTTP client used to retrieve JWKS and load keys from snapshot
+        file if it exists.
+        """
+        self._get_http_client()
+        if self._snapshot_path and os.path.exists(self._snapshot_path):
+            try:
+                self.load_snapshot(self._snapshot_path)
+            except Exception as error:
+                logger.warning(
+                    f"Failed to load jwks snapshot from "
+                    f"`{self._snapshot_path}`: {error}"
+                )
+
+    async def warmup(
+            self,
+            keys_urls: Iterable[str],
+            observer: Optional[AuthObserver] = None
+    ) -> None:
+        """
+        Retrieve and import keys for all JWKS URLs concurrently. JWKS which is
+        already loaded(e.g. from snapshot) is refreshed in background if it is
+        stale.
+        :param keys_urls: JWKS URLs or paths
+        :param observer: Optional observer notified about JWKS retrievals
+        :raise CognitoJWTException: if any JWKS could not be loaded
+        """
+        keys_urls = list(dict.fromkeys(keys_urls))
+        missing_urls = [
+            url for url in keys_urls if url not in self._key_sets
+        ]
+        results = await asyncio.gather(
+            *(self.refresh(url, observer) for url in missing_urls),
+            return_exceptions=True
+        )
+        failed_urls = [
+            url for url, result in zip(missing_urls, results)
+            if isinstance(result, BaseException)
+        ]
+        if failed_urls:
+            raise CognitoJWTException(
+                f"Failed to load jwks from: {', '.join(failed_urls)}",
+                "jwks_error"
+            )
+
+        for url in keys_urls:
+            # JWKS may be already evicted if there are more URLs than limits
+            key_set = self._key_sets.get(url)
+            if key_set is not None and \
+                    key_set.age >= self._max_age - self._refresh_before:
+                self._schedule_refresh(url, observer)
+        if self._snapshot_path:
+            self.save_snapshot(self._snapshot_path)
+
+    async def shutdown(self) -> None:
+        """
+        Cancel running background refreshes, save snapshot if configured and
+        close HTTP client if it is created by `KeyStore`.
+        """
+        for task in list(self._refresh_tasks.values()):
+            task.cancel()
+        self._refresh_tasks.clear()
+        if self._snapshot_path and self._key_sets:
+            self.save_snapshot(self._snapshot_path)
+        if self._owns_http_client and self._http_client is not None:
+            if self._http_client_loop is asyncio.get_running_loop():
+                await self._http_client.aclose()
+            self._http_client = None
+
+    def _get_http_client(self) -> "httpx.AsyncClient":
+        loop = asyncio.get_running_loop()
+        if self._owns_http_client and self._http_client_loop is not loop:
+            # connections of client created in other event loop can't be
+            # used or closed from this one, they are dropped with client
+            self._http_client = None
+            self._http_client_loop = loop
+        if self._http_client is None:
+            # imported on first use, so applications which read JWKS only
+            # from files don't pay for it
+            import httpx
+            self._http_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(
+                    self._read_timeout, connect=self._connect_timeout
+                ),
+                limits=httpx.Limits(
+                    max_connections=self._max_connections,
+                    max_keepalive_connections=self._max_keepalive_connections,
+                    keepalive_expiry=self._keepalive_expiry
+                )
+            )
+        return self._http_client
+
+    def register_source(
+            self,
+            keys_url: str,
+            source: Callable[[], List[dict]]
+    ) -> None:
+        """
+        Register in-memory JWKS source, e.g. fake userpool in tests. JWKS for
+        `keys_url` is retrieved by calling `source` instead of HTTP request
+        or reading file.
+        :param keys_url: JWKS URL, any unique value
+        :param source: Function which returns list of keys from JWKS `keys`
+         field
+        """
+        self._sources[keys_url] = source
+
+    def get_key_set(self, keys_url: str) -> Optional[KeySet]:
+        """
+        :return: `KeySet` for `keys_url` if loaded, else None
+        """
+        return self._key_sets.get(keys_url)
+
+    def load(
+            self,
+            keys_url: str,
+            jwks: List[dict],
+            fetched_at: Optional[float] = None
+    ) -> KeySet:
+        """
+        Import keys and replace `KeySet` for `keys_url`
+        :param keys_url: JWKS URL or path
+        :param jwks: List of keys from JWKS `keys` field
+        :param fetched_at: Timestamp when JWKS was retrieved
+        :return: new `KeySet`
+        """
+        key_set = KeySet(jwks, fetched_at=fetched_at)
+        previous = self._key_sets.pop(keys_url, None)
+        if previous is not None:
+            self._size -= previous.size
+            key_set.lookups = previous.lookups // 2
+        self._key_sets[keys_url] = key_set
+        self._size += key_set.size
+        if self._bounded:
+            self._evict(keys_url)
+        return key_set
+
+    def _evict(self, keep: str) -> None:
+        """
+        Evict JWKS until limits are satisfied, JWKS for `keep` is never
+        evicted.
+        """
+        while len(self._key_sets) > 1 and (
+            (self._max_pools is not None and
+             len(self._key_sets) > self._max_pools) or
+            (self._max_bytes is not None and self._size > self._max_bytes)
+        ):
+            candidates = (url for url in self._key_sets if url != keep)
+            if self._eviction == "lru":
+                victim = next(candidates)
+            else:
+                victim = min(
+                    candidates, key=lambda url: self._key_sets[url].lookups
+                )
+            self._size -= self._key_sets.pop(victim).size
+            self._file_versions.pop(victim, None)
+            self._pool_stats(victim).evictions += 1
+
+    def _pool_stats(self, keys_url: str) -> PoolStats:
+        stats = self._stats.get(keys_url)
+        if stats is None:
+            stats = self._stats[keys_url] = PoolStats()
+        return stats
+
+    def pool_stats(self, keys_url: str) -> Dict[str, int]:
+        """
+        :return: Statistics of JWKS URL: key lookups, retrievals, failed
+         retrievals, lookups of unknown `kid`, evictions and estimated size
+         if it is loaded.
+        """
+        key_set = self._key_sets.get(keys_url)
+        return dict(
+            self._pool_stats(keys_url).as_dict(),
+            size=key_set.size if key_set is not None else 0
+        )
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """
+        Number of loaded JWKS, estimated memory used by imported keys and
+        total number of evictions.
+        """
+        return {
+            "pools": len(self._key_sets),
+            "size": self._size,
+            "evictions": sum(
+                stats.evictions for stats in self._stats.values()
+            ),
+        }
+
+    def save_snapshot(self, path: str) -> None:
+        """
+        Write all loaded JWKS with their retrieval time to local file. File is
+        replaced atomically, temporary file is named by process id, so workers
+        sharing `path` don't write into the same temporary file.
+        :param path: Snapshot file path
+        """
+        snapshot = {
+            url: {"fetched_at": key_set.fetched_at, "keys": key_set.jwks}
+            for url, key_set in self._key_sets.items()
+        }
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(snapshot, file)
+        os.replace(tmp_path, path)
+
+    def load_snapshot(self, path: str) -> None:
+        """
+        Load JWKS from snapshot file written by `save_snapshot`. Loaded keys
+        keep their original retrieval time, so stale keys are refreshed in
+        background on first use.
+        :param path: Snapshot file path
+        """
+        with open(path) as file:
+            snapshot = json.load(file)
+        for url, entry in snapshot.items():
+            self.load(url, entry["keys"], fetched_at=entry["fetched_at"])
+
+    def clear(self) -> None:
+        self._key_sets.clear()
+        self._size = 0
+        self._last_fetch.clear()
+        self._file_versions.clear()
+        self._last_stat.clear()
+
+    async def refresh(
+            self,
+            keys_url: str,
+            observer: Optional[AuthObserver] = None
+    ) -> KeySet:
+        """
+        Retrieve JWKS and replace loaded `KeySet` for `keys_url`. If retrieval
+        of the same JWKS is already in progress, its result is awaited instead
+        of starting a new one.
+        :param keys_url: JWKS URL or path
+        :param observer: Optional observer notified about retrieval if it is
+         started by this call
+        :return: new `KeySet`
+        """
+        pending = self._pending.get(keys_url)
+        if pending is None or \
+                pending.get_loop() is not asyncio.get_running_loop():
+            pending = asyncio.ensure_future(
+                self._refresh(keys_url, observer)
+            )
+            self._pending[keys_url] = pending
+
+            def remove_pending(done: asyncio.Future) -> None:
+                # retrieval of other event loop may have replaced it
+                if self._pending.get(keys_url) is done:
+                    del self._pending[keys_url]
+
+            pending.add_done_callback(remove_pending)
+        # shield shared retrieval from cancellation of a single waiter
+        return await asyncio.shield(pending)
+
+    async def _refresh(
+            self,
+            keys_url: str,
+            observer: Optional[AuthObserver]
+    ) -> KeySet:
+        self._last_fetch[keys_url] = time.monotonic()
+        if self._shared_cache is None:
+            return await self._fetch_and_load(keys_url, observer)
+
+        key_set = self._load_shared(keys_url)
+        if key_set is not None:
+            return key_set
+        async with self._shared_cache.jwks_lock(keys_url):
+            # other worker may have retrieved JWKS while lock was awaited
+            key_set = self._load_shared(keys_url)
+            if key_set is None:
+                key_set = await self._fetch_and_load(keys_url, observer)
+                self._shared_cache.set_jwks(
+                    keys_url, key_set.jwks, key_set.fetched_at
+                )
+            return key_set
+
+    def _load_shared(self, keys_url: str) -> Optional[KeySet]:
+        """
+        Load JWKS retrieved by other worker if it is newer than loaded one
+        and not stale.
+        """
+        entry = self._shared_cache.get_jwks(keys_url)
+        if entry is None:
+            return None
+        jwks, fetched_at = entry
+        key_set = self._key_sets.get(keys_url)
+        if (key_set is not None and fetched_at <= key_set.fetched_at) or \
+                time.time() - fetched_at >= \
+                self._max_age - self._refresh_before:
+            return None
+        return self.load(keys_url, jwks, fetched_at=fetched_at)
+
+    async def _fetch_and_load(
+            self,
+            keys_url: str,
+            observer: Optional[AuthObserver]
+    ) -> KeySet:
+        stats = self._pool_stats(keys_url)
+        stats.fetches += 1
+        try:
+            return await self._observed_fetch_and_load(keys_url, observer)
+        except Exception:
+            stats.fetch_errors += 1
+            raise
+
+    async def _observed_fetch_and_load(
+            self,
+            keys_url: str,
+            observer: Optional[AuthObserver]
+    ) -> KeySet:
+        observers = self._get_observers(observer)
+        if not observers:
+            return self.load(keys_url, await self._fetch_keys(keys_url))
+
+        start = time.perf_counter()
+        success = False
+        try:
+            key_set = self.load(keys_url, await self._fetch_keys(keys_url))
+            success = True
+            return key_set
+        finally:
+            duration = time.perf_counter() - start
+            for jwks_observer in observers:
+                jwks_observer.on_jwks_fetch(keys_url, duration, success)
+
+    async def get_key(
+            self,
+            keys_url: str,
+            kid: str,
+            observer: Optional[AuthObserver] = None
+    ) -> jwk.Key:
+        """
+        Get imported public key with `kid` from JWKS, retrieve JWKS if it is
+        not loaded yet or if `kid` is unknown.
+        :param keys_url: JWKS URL or path
+        :param kid: `kid` value from token header
+        :param observer: Optional observer notified about this lookup and
+         JWKS retrievals it starts, in addition to registered observers
+        :return: `joserfc.jwk.Key`
+        """
+        key_set = self._key_sets.get(keys_url)
+        self._pool_stats(keys_url).lookups += 1
+        if key_set is not None and self._bounded:
+            self._key_sets.move_to_end(keys_url)
+            key_set.lookups += 1
+        observers = self._get_observers(observer)
+        if observers:
+            for lookup_observer in observers:
+                lookup_observer.on_cache("jwks", key_set is not None)
+        is_file = keys_url not in self._sources and \
+            not keys_url.startswith("http")
+        if key_set is None:
+            key_set = await self.refresh(keys_url, observer)
+        elif is_file:
+            if self._file_changed(keys_url):
+                key_set = await self.refresh(keys_url, observer)
+        elif key_set.age >= self._max_age - self._refresh_before:
+            if self._max_stale is not None and \
+                    key_set.age >= self._max_age + self._max_stale:
+                key_set = await self._refresh_expired(keys_url, observer)
+            else:
+                self._schedule_refresh(keys_url, observer)
+
+        key = key_set.get(kid)
+        if key is None and (
+            keys_url in self._pending or (
+                self._file_changed(keys_url, force=True) if is_file
+                else self._can_refetch(keys_url)
+            )
+        ):
+            key = (await self.refresh(keys_url, observer)).get(kid)
+
+        if key is None:
+            self._pool_stats(keys_url).unknown_kid += 1
+            raise CognitoJWTException(
+                "Public key not found, check userpool configuration.",
+                "unknown_kid"
+            )
+        return key
+
+    async def _refresh_expired(
+            self,
+            keys_url: str,
+            observer: Optional[AuthObserver]
+    ) -> KeySet:
+        """
+        Retrieve JWKS which is older than `max_age + max_stale`. Retrieval is
+        rate limited by `min_refetch_interval`, lookups between retrievals
+        fail without waiting.
+        """
+        if keys_url in self._pending or self._can_refetch(keys_url):
+            return await self.refresh(keys_url, observer)
+        raise CognitoJWTException(
+            "Public keys are expired and could not be refreshed.",
+            "jwks_error"
+        )
+
+    @staticmethod
+    def _file_version(path: str) -> Tuple[int, int, int]:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_ino, stat.st_size
+
+    def _file_changed(self, path: str, force: bool = False) -> bool:
+        """
+        Check if JWKS file changed since it was loaded, file is checked at
+        most once per `file_poll_interval` seconds unless `force` is set.
+        """
+        now = time.monotonic()
+        if not force and \
+                now - self._last_stat.get(path, 0) < self._file_poll_interval:
+            return False
+        self._last_stat[path] = now
+        try:
+            return self._file_version(path) != self._file_versions.get(path)
+        except OSError as error:
+            logger.warning(
+                f"Failed to check jwks file `{path}`, loaded keys will be "
+                f"used: {error}"
+            )
+            return False
+
+    def _can_refetch(self, keys_url: str) -> bool:
+        last_fetch = self._last_fetch.get(keys_url)
+        return (
+            last_fetch is None or
+            time.monotonic() - last_fetch >= self._min_refetch_interval
+        )
+
+    def _schedule_refresh(
+            self,
+            keys_url: str,
+            observer: Optional[AuthObserver] = None
+    ) -> None:
+        """
+        Start background refresh of JWKS if it is not already running.
+        """
+        loop = asyncio.get_running_loop()
+        task = self._refresh_tasks.get(keys_url)
+        # task of closed event loop never finishes, so it is replaced
+        if (task is not None and task.get_loop() is loop) or \
+                not self._can_refetch(keys_url):
+            return
+        task = loop.create_task(self._background_refresh(keys_url, observer))
+        self._refresh_tasks[keys_url] = task
+
+    async def _background_refresh(
+            self,
+            keys_url: str,
+            observer: Optional[AuthObserver]
+    ) -> None:
+        try:
+            await self.refresh(keys_url, observer)
+        except Exception as error:
+            logger.warning(
+                f"Background refresh of jwks from `{keys_url}` failed, "
+                f"stale keys will be used until next refresh: {error}"
+            )
+        finally:
+            if self._refresh_tasks.get(keys_url) is asyncio.current_task():
+                del self._refresh_tasks[keys_url]
+
+    async def _fetch_keys(self, keys_url: str) -> List[dict]:
+        """
+        Retrieves public keys from AWS Cognito or read from file
+
+        :return: List of public keys
+        """
+        try:
+            source = self._sources.get(keys_url)
+            if source is not None:
+                return source()
+            if keys_url.startswith("http"):
+                response = await self._get_http_client().get(keys_url)
+                response.raise_for_status()
+                data = response.json()
+            else:
+                # version is taken before reading, so change made during read
+                # is detected on next check
+                self._file_versions[keys_url] = self._file_version(keys_url)
+                self._last_stat[keys_url] = time.monotonic()
+                from aiofile import AIOFile
+                async with AIOFile(keys_url, 'r') as afp:
+                    f = await afp.read()
+                    data = json.loads(f)
+            return data.get('keys')
+        except Exception as e:
+            logger.error(
+                f"ERROR: Following error occurred while retrieving jwks from "
+                f"`{keys_url}`: {e} - "
+                f"Check if your configuration `settings.jwks_url` or "
+                f"`AWS_COGNITO_KEYS_URL` environment variable is correct."
+            )
+            raise CognitoJWTException(
+                "Failed to decode JWT token.", "jwks_error"
+            )
+
+
+default_key_store = KeyStore()
@@ -0,0 +1,137 @@
+import logging
+import os
+import time
+from typing import Any, Iterable, Optional, Set, Tuple
+
+from fastapi_cognito.cognito_jwt.exceptions import CognitoJWTException
+
+logger = logging.getLogger(__name__)
+
+# Claims checked against revocation list
+REVOCATION_CLAIMS: Tuple[str, ...] = ("jti", "origin_jti")
+
+
+class RevocationList(object):
+    """
+    Local denylist of revoked token IDs(`jti` and `origin_jti` claims), kept
+    in a `set`, so lookup is a single hash lookup of `str` which caches its
+    hash.
+
+    IDs can be added incrementally with `update`, e.g. from a message queue
+    consumer, or read from file with one ID per line. File is checked at most
+    once per `poll_interval` seconds and only lines appended since the last
+    read are read; if file is replaced or truncated it is read again from
+    start and IDs read from previous file are dropped, so IDs pruned from file
+    stop being revoked and free memory. IDs from file are kept apart from IDs
+    added with `update`, which are never dropped.
+    """
+
+    def __init__(
+            self,
+            ids: Iterable[str] = (),
+            path: Optional[str] = None,
+            poll_interval: float = 1
+    ):
+        """
+        Initialization
+        :param ids: Initially revoked IDs
+        :param path: Optional file with revoked IDs, one per line
+        :param poll_interval: Minimal time in seconds between two checks of
+         `path` for new IDs.
+        """
+        self._ids: Set[str] = set()
+        self._file_ids: Set[str] = set()
+        self._path: Optional[str] = path
+        self._poll_interval: float = poll_interval
+        self._last_poll: float = 0.0
+        self._file_id: Optional[Tuple[int, int]] = None
+        self._offset: int = 0
+        self.update(ids)
+        if path is not None:
+            self.refresh()
+
+    def __len__(self) -> int:
+        return len(self._ids.union(self._file_ids))
+
+    def update(self, ids: Iterable[str]) -> None:
+        """
+        Add revoked IDs.
+        """
+        self._ids.update(ids)
+
+    def add(self, revoked_id: str) -> None:
+        """
+        Add single revoked ID.
+        """
+        self.update((revoked_id,))
+
+    def __contains__(self, revoked_id: Optional[str]) -> bool:
+        return revoked_id in self._ids or revoked_id in self._file_ids
+
+    def is_revoked(self, claims: Any) -> bool:
+        """
+        Check if token is revoked.
+        :param claims: Dict with token claims or token model with `jti` and
+         `origin_jti` attributes
+        :return: True if `jti` or `origin_jti` is revoked
+        """
+        if self._path is not None:
+            self._poll()
+        if not self._ids and not self._file_ids:
+            return False
+        get = claims.get if isinstance(claims, dict) else \
+            lambda claim: getattr(claims, claim, None)
+        for claim in REVOCATION_CLAIMS:
+            if get(claim) in self:
+                return True
+        return False
+
+    def check(self, claims: Any) -> None:
+        """
+        Raise `CognitoJWTException` if token is revoked.
+        """
+        if self.is_revoked(claims):
+            raise CognitoJWTException("Token is revoked.", "revoked")
+
+    def _poll(self) -> None:
+        now = time.monotonic()
+        if now - self._last_poll >= self._poll_interval:
+            self._last_poll = now
+            self.refresh()
+
+    def refresh(self) -> None:
+        """
+        Read IDs appended to `path` since last read, or all IDs if file is
+        replaced or truncated.
+        """
+        try:
+            stat = os.stat(self._path)
+            file_id = (stat.st_dev, stat.st_ino)
+            # replaced or truncated file is read from start
+            reset = file_id != self._file_id or stat.st_size < self._offset
+            offset = 0 if reset else self._offset
+            data = b""
+            if stat.st_size > offset:
+                with open(self._path, "rb") as file:
+                    file.seek(offset)
+                    data = file.read(stat.st_size - offset)
+        except OSError as error:
+            logger.warning(
+                f"Failed to read revocation list `{self._path}`: {error}"
+            )
+            return
+
+        # incomplete last line is read again on next refresh
+        end = data.rfind(b"\n") + 1
+        ids = {
+            line.strip() for line in data[:end].decode("utf-8").splitlines()
+            if line.strip()
+        }
+        self._file_id = file_id
+        self._offset = offset + end
+        if reset:
+            # new set replaces old one at once, lookups never see it partially
+            self._file_ids = ids
+        else:
+            self._file_ids.update(ids)
+
@@ -0,0 +1,303 @@
+import asyncio
+import hashlib
+import json
+import logging
+import mmap
+import os
+import stat
+import struct
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Slot header: token digest, expiration time and payload length
+SLOT_HEADER = struct.Struct("<32sdI")
+TOKENS_FILE = "tokens.cache"
+# Cache files are trusted like JWKS endpoint, only owner can access them
+DIRECTORY_MODE = 0o700
+FILE_MODE = 0o600
+
+
+class SharedCache(object):
+    """
+    Cache shared by all worker processes on the same host, e.g. gunicorn or
+    uvicorn workers, through files in `directory`. `directory` should be on
+    local filesystem, preferably tmpfs, and private to the user which runs
+    workers(e.g. `/run/user/<uid>/fastapi-cognito`). Keys found in
+    `directory` are trusted, so `directory` is created with mode `0o700` and
+    `SharedCache` refuses to use directory which is not owned by current user
+    or is writable by group or others. Files are created with mode `0o600`.
+
+    JWKS is stored as JSON file per JWKS URL. `KeyStore` retrieves JWKS under
+    cross-process lock and other workers load it from file, so there is a
+    single retrieval per host.
+
+    Claims of verified tokens are stored in memory-mapped file with
+    `max_entries` fixed size slots, slot is selected by SHA-256 digest of the
+    token and `context` which identifies configuration that verified it, so
+    claims verified for one userpool or app client are never returned for
+    another. Entry replaces any entry in its slot, so eviction needs no
+    bookkeeping, and slots are guarded with `fcntl` record locks. Claims larger
+    than `slot_size` are not cached.
+
+    All workers must use the same `max_entries` and `slot_size`, existing
+    tokens file with different size is rejected with `ValueError`.
+    """
+
+    def __init__(
+            self,
+            directory: str,
+            max_entries: int = 16384,
+            slot_size: int = 2048,
+            lock_timeout: float = 10
+    ):
+        """
+        Initialization
+        :param directory: Directory where cache files are kept, created if it
+         doesn't exist. It must be owned by current user and not writable by
+         group or others.
+        :param max_entries: Number of slots for verified tokens.
+        :param slot_size: Size of slot in bytes, including 44 bytes header.
+        :param lock_timeout: Maximal time in seconds to wait for JWKS
+         retrieval in another worker before retrieving it anyway.
+        """
+        if fcntl is None:
+            raise RuntimeError("SharedCache requires `fcntl` module.")
+        if max_entries < 1 or slot_size <= SLOT_HEADER.size:
+            raise ValueError(
+                "`max_entries` must be greater than 0 and `slot_size` "
+                f"greater than {SLOT_HEADER.size}."
+            )
+        os.makedirs(directory, mode=DIRECTORY_MODE, exist_ok=True)
+        self._check_directory(directory)
+        self._directory: str = directory
+        self._max_entries: int = max_entries
+        self._slot_size: int = slot_size
+        self._lock_timeout: float = lock_timeout
+        self._fd: Optional[int] = None
+        self._mmap: Optional[mmap.mmap] = None
+        self.hits: int = 0
+        self.misses: int = 0
+        # file is mapped on first use, but its size is checked now, so
+        # mismatched configuration fails on startup
+        os.close(self._open_tokens_file())
+
+    @staticmethod
+    def _check_directory(directory: str) -> None:
+        """
+        Refuse directory where other users could plant JWKS or claims.
+        """
+        info = os.stat(directory)
+        if not stat.S_ISDIR(info.st_mode):
+            raise ValueError(f"`{directory}` is not a directory.")
+        if info.st_uid != os.getuid():
+            raise PermissionError(
+                f"`{directory}` is not owned by current user, shared cache "
+                f"requires private directory."
+            )
+        if info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+            raise PermissionError(
+                f"`{directory}` is writable by group or others, shared cache "
+                f"requires private directory."
+            )
+
+    @staticmethod
+    def digest(value: str) -> bytes:
+        return hashlib.sha256(value.encode("utf-8")).digest()
+
+    @staticmethod
+    def claims_key(token: str, context: str) -> bytes:
+        digest = hashlib.sha256(context.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(token.encode("utf-8"))
+        return digest.digest()
+
+    def _jwks_path(self, keys_url: str, suffix: str) -> str:
+        return os.path.join(
+            self._directory, f"jwks-{self.digest(keys_url).hex()[:32]}{suffix}"
+        )
+
+    def get_jwks(self, keys_url: str) -> Optional[Tuple[List[dict], float]]:
+        """
+        :return: Tuple of keys and retrieval timestamp of shared JWKS for
+         `keys_url`, None if it is not stored
+        """
+        try:
+            with open(self._jwks_path(keys_url, ".json")) as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if entry.get("url") != keys_url:
+            return None
+        return entry["keys"], entry["fetched_at"]
+
+    def set_jwks(
+            self,
+            keys_url: str,
+            jwks: List[dict],
+            fetched_at: float
+    ) -> None:
+        """
+        Store JWKS for other workers, file is replaced atomically.
+        """
+        path = self._jwks_path(keys_url, ".json")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        fd = os.open(
+            tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, FILE_MODE
+        )
+        with os.fdopen(fd, "w") as file:
+            json.dump(
+                {"url": keys_url, "fetched_at": fetched_at, "keys": jwks}, file
+            )
+        os.replace(tmp_path, path)
+
+    @asynccontextmanager
+    async def jwks_lock(self, keys_url: str) -> AsyncIterator[bool]:
+        """
+        Cross-process lock for JWKS retrieval. Lock is polled, so event loop
+        is not blocked while other worker retrieves JWKS.
+        :return: True if lock is acquired, False if `lock_timeout` passed
+        """
+        fd = os.open(
+            self._jwks_path(keys_url, ".lock"),
+            os.O_RDWR | os.O_CREAT,
+            FILE_MODE
+        )
+        acquired = False
+        try:
+            deadline = time.monotonic() + self._lock_timeout
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    acquired = True
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        logger.warning(
+                            f"Timed out waiting for jwks retrieval of "
+                            f"`{keys_url}` in other worker."
+                        )
+                        break
+                    await asyncio.sleep(0.01)
+            yield acquired
+        finally:
+            if acquired:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def _open_tokens_file(self) -> int:
+        """
+        Open verified tokens file, new file is sized for `max_entries` slots.
+        File is never resized, because other workers have it mapped.
+        :return: File descriptor
+        """
+        size = self._max_entries * self._slot_size
+        path = os.path.join(self._directory, TOKENS_FILE)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, FILE_MODE)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                current_size = os.fstat(fd).st_size
+                if current_size == 0:
+                    os.ftruncate(fd, size)
+                elif current_size != size:
+                    raise ValueError(
+                        f"`{path}` is created with different `max_entries` "
+                        f"or `slot_size`, all workers must use the same "
+                        f"values or different `directory`."
+                    )
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        except BaseException:
+            os.close(fd)
+            raise
+        return fd
+
+    def _get_mmap(self) -> mmap.mmap:
+        if self._mmap is None:
+            fd = self._open_tokens_file()
+            self._fd = fd
+            self._mmap = mmap.mmap(fd, self._max_entries * self._slot_size)
+        return self._mmap
+
+    def _slot(self, key: bytes) -> int:
+        index = int.from_bytes(key[:8], "little") % self._max_entries
+        return index * self._slot_size
+
+    def get_claims(
+            self,
+            token: str,
+            context: str = ""
+    ) -> Optional[Dict[str, Any]]:
+        """
+        :param token: Raw JWT token
+        :param context: Configuration which verified token, the same value
+         which is passed to `set_claims`
+        :return: Claims of verified token if cached and not expired, else
+         None
+        """
+        key = self.claims_key(token, context)
+        data = self._get_mmap()
+        offset = self._slot(key)
+        fcntl.lockf(self._fd, fcntl.LOCK_SH, self._slot_size, offset)
+        try:
+            digest, expires_at, length = SLOT_HEADER.unpack_from(data, offset)
+            payload = None
+            if digest == key and expires_at > time.time():
+                start = offset + SLOT_HEADER.size
+                payload = data[start:start + length]
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, self._slot_size, offset)
+
+        if payload is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(payload)
+
+    def set_claims(
+            self,
+            token: str,
+            claims: Dict[str, Any],
+            exp: float,
+            context: str = ""
+    ) -> None:
+        """
+        Cache claims of verified token until token expiration time.
+        :param token: Raw JWT token
+        :param claims: Verified token claims
+        :param exp: Token expiration time(`exp` claim)
+        :param context: Configuration which verified token, e.g. JWKS URL,
+         issuer and app client id.
+        """
+        payload = json.dumps(claims, separators=(",", ":")).encode("utf-8")
+        if len(payload) > self._slot_size - SLOT_HEADER.size or \
+                exp <= time.time():
+            return
+        key = self.claims_key(token, context)
+        data = self._get_mmap()
+        offset = self._slot(key)
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, self._slot_size, offset)
+        try:
+            SLOT_HEADER.pack_into(data, offset, key, exp, len(payload))
+            start = offset + SLOT_HEADER.size
+            data[start:start + len(payload)] = payload
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, self._slot_size, offset)
+
+    def close(self) -> None:
+        """
+        Unmap verified tokens file in current process, files are kept.
+        """
+        if self._mmap is not None:
+            self._mmap.close()
+            os.close(self._fd)
+            self._mmap = None
+            self._fd = None
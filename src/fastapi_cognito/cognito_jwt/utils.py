@@ -2,7 +2,11 @@ import base64
 import binascii
 import json
 import time
-from typing import Union, Container, Dict, Mapping
+from typing import Union, Container, Dict, Mapping, Any, Optional
+
+from joserfc import jwk
+from joserfc.errors import JoseError
+from joserfc.jws import JWSRegistry
 
 from fastapi_cognito.cognito_jwt.exceptions import CognitoJWTException
 
@@ -11,13 +15,169 @@ CLIENT_ID_KEYS: Dict[str, str] = {
     'id': 'aud'
 }
 
+# Registry with algorithms recommended by joserfc, same as used by
+# `joserfc.jwt.decode` when no algorithms are provided.
+JWS_REGISTRY = JWSRegistry()
+
+
+def _base64url_decode(value: bytes) -> bytes:
+    """
+    Decodes token header and claims and fix padding if not correct
+    """
+    rem = len(value) % 4
+
+    if rem > 0:
+        value += b"=" * (4 - rem)
+
+    return base64.urlsafe_b64decode(value)
+
+
+class ParsedToken(object):
+    """
+    JWT compact serialization parsed once, with decoded header and raw signing
+    input, so it can be used for key selection, signature verification and
+    claims checks without parsing token again. Header which is not a JSON
+    object or has no string `kid` is rejected as malformed.
+    """
+    __slots__ = (
+        "header", "signing_input", "payload_segment", "signature_segment",
+        "_claims"
+    )
+
+    def __init__(self, token: Union[str, bytes]):
+        """
+        Initialization
+        :param token: JWT compact serialization
+        """
+        if isinstance(token, str):
+            token = token.encode("utf-8")
+        header_end = token.find(b".")
+        signature_start = token.rfind(b".")
+        if header_end == -1 or header_end == signature_start:
+            raise CognitoJWTException("Not enough segments.", "malformed")
+
+        try:
+            header_data = _base64url_decode(token[:header_end])
+        except (TypeError, binascii.Error):
+            raise CognitoJWTException(f"Invalid header padding.", "malformed")
+
+        try:
+            header = json.loads(header_data.decode("utf-8"))
+        except ValueError as e:
+            raise CognitoJWTException(
+                f"Invalid header string: {e}", "malformed"
+            )
+        if not isinstance(header, dict):
+            raise CognitoJWTException(
+                "Invalid header string: header must be an object.", "malformed"
+            )
+        if not isinstance(header.get("kid"), str):
+            raise CognitoJWTException(
+                "Invalid header string: `kid` must be a string.", "malformed"
+            )
+
+        self.header: Dict[str, Any] = header
+        self.signing_input: bytes = token[:signature_start]
+        self.payload_segment: bytes = token[header_end + 1:signature_start]
+        self.signature_segment: bytes = token[signature_start + 1:]
+        self._claims: Optional[Dict] = None
+
+    @property
+    def kid(self) -> str:
+        return self.header["kid"]
+
+    @property
+    def unverified_claims(self) -> Dict:
+        """
+        Token claims decoded without signature verification, decoded once.
+        """
+        if self._claims is None:
+            try:
+                claims = json.loads(_base64url_decode(self.payload_segment))
+            except (TypeError, ValueError):
+                raise CognitoJWTException("Invalid token payload.", "malformed")
+            if not isinstance(claims, dict):
+                raise CognitoJWTException("Invalid token payload.", "malformed")
+            self._claims = claims
+        return self._claims
+
+    @property
+    def signature(self) -> bytes:
+        try:
+            return _base64url_decode(self.signature_segment)
+        except (TypeError, binascii.Error):
+            raise CognitoJWTException(
+                "Token signature verification failed.", "bad_signature"
+            )
+
+
+def parse_token(token: Union[str, bytes, ParsedToken]) -> ParsedToken:
+    """
+    Parse JWT without validation, already parsed token is returned as is.
+
+    :return: `ParsedToken`
+    """
+    if isinstance(token, ParsedToken):
+        return token
+    return ParsedToken(token)
+
+
+def verify_signature(token: ParsedToken, public_key: jwk.Key) -> Dict:
+    """
+    Verify JWT signature with public key and decode token claims. `joserfc`
+    errors are raised as `CognitoJWTException`, invalid header or algorithm
+    which doesn't match key type with `malformed` reason and key which can't
+    be used for verification with `bad_signature` reason.
+
+    :return: Dict with token claims.
+    """
+    header = token.header
+    if "alg" not in header:
+        raise CognitoJWTException("Missing token algorithm.", "malformed")
+    try:
+        JWS_REGISTRY.check_header(header)
+        alg = JWS_REGISTRY.get_alg(header["alg"])
+    except JoseError as error:
+        raise CognitoJWTException(
+            f"Unsupported token header: {error}", "malformed"
+        )
+    if alg.key_type != public_key.key_type:
+        raise CognitoJWTException("Unsupported token algorithm.", "malformed")
+    try:
+        alg.check_key(public_key)
+    except JoseError:
+        raise CognitoJWTException(
+            "Public key can't be used to verify token.", "bad_signature"
+        )
+
+    if not alg.verify(token.signing_input, token.signature, public_key):
+        raise CognitoJWTException(
+            "Token signature verification failed.", "bad_signature"
+        )
+    return token.unverified_claims
+
 
 def check_expired(exp: int, testmode: bool = False) -> None:
     """
-    Check if JWT token is expired if test mode is not enabled.
+    Check if JWT token is expired if test mode is not enabled. Missing or
+    non-numeric `exp` is rejected even in test mode.
     """
+    if not isinstance(exp, (int, float)) or isinstance(exp, bool):
+        raise CognitoJWTException(
+            "Token has missing or invalid expiration.", "malformed"
+        )
     if time.time() > exp and not testmode:
-        raise CognitoJWTException("Token is expired.")
+        raise CognitoJWTException("Token is expired.", "expired")
+
+
+def check_issuer(claims: Dict, issuer: str) -> None:
+    """
+    Check if JWT is issued by userpool with provided `issuer` URL
+    """
+    if claims.get("iss") != issuer:
+        raise CognitoJWTException(
+            "Token was not issued by this userpool.", "invalid_issuer"
+        )
 
 
 def check_client_id(
@@ -34,7 +194,8 @@ def check_client_id(
     if not client_id_key:
         raise CognitoJWTException(
             f"Invalid token use {token_use}."
-            f" Valid values: {list(CLIENT_ID_KEYS.keys())}"
+            f" Valid values: {list(CLIENT_ID_KEYS.keys())}",
+            "invalid_token_use"
         )
 
     if isinstance(app_client_id, str):
@@ -42,46 +203,10 @@ def check_client_id(
 
     if claims[client_id_key] not in app_client_id:
         raise CognitoJWTException(
-            "Token was not issued for this client id audience."
+            "Token was not issued for this client id audience.",
+            "invalid_client"
         )
 
 
-def __base64url_decode(value: str) -> bytes:
-    """
-    Decodes token header and claims and fix padding if not correct
-    """
-    rem = len(value) % 4
-
-    if rem > 0:
-        value += b"=" * (4 - rem)
-
-    return base64.urlsafe_b64decode(value)
-
-
-def __get_token_header(jwt: str) -> Dict[str, str]:
-    """
-    Retrieve JWT token header without validation
-
-    :return: Unvalidated JWT token header
-    """
-    if isinstance(jwt, str):
-        jwt = jwt.encode("utf-8")
-    try:
-        signing_input, crypto_segment = jwt.rsplit(b".", 1)
-        header_segment, claims_segment = signing_input.split(b".", 1)
-        header_data = __base64url_decode(header_segment)
-    except ValueError:
-        raise CognitoJWTException("Not enough segments.")
-    except (TypeError, binascii.Error):
-        raise CognitoJWTException(f"Invalid header padding.")
-
-    try:
-        header = json.loads(header_data.decode("utf-8"))
-    except ValueError as e:
-        raise CognitoJWTException(f"Invalid header string: {e}")
-
-    return header
-
-
 def get_unverified_token_header(jwt: str) -> Mapping[str, str]:
-    return __get_token_header(jwt)
+    return parse_token(jwt).header
@@ -1,14 +1,33 @@
-from typing import Dict, Any
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, AsyncIterator, List, Callable, \
+    Awaitable, FrozenSet
 
 from fastapi.exceptions import HTTPException
 from pydantic_settings import BaseSettings
 from starlette.requests import HTTPConnection
 
-from .cognito_jwt.decode import decode_cognito_jwt
+from .cache import TokenCache, RejectionCache, TRANSIENT_REASONS
+from .cognito_jwt.backends import VerificationBackend, default_backend
+from .cognito_jwt.decode import decode_cognito_jwt, get_jwks_url, \
+    get_issuer_url
 from .cognito_jwt.exceptions import CognitoJWTException
+from .cognito_jwt.executor import VerificationExecutor
+from .cognito_jwt.instrumentation import AuthObserver, STAGE_HEADER, \
+    STAGE_MODEL
+from .cognito_jwt.keys import KeyStore, default_key_store
+from .cognito_jwt.revocation import RevocationList
+from .cognito_jwt.shared_cache import SharedCache
+from .cognito_jwt.utils import ParsedToken, parse_token
 from .exceptions import CognitoAuthError
 from .models import UserpoolModel, CognitoToken
 
+# Key in connection `scope["state"]` where authentication results are memoized
+AUTH_STATE_KEY = "fastapi_cognito"
+# Source of unique `TokenCache` namespaces of `CognitoAuth` objects
+_cache_namespaces = itertools.count()
+
 
 class CognitoAuth(object):
     """
@@ -19,7 +38,16 @@ class CognitoAuth(object):
             self,
             settings: BaseSettings,
             userpool_name: str = None,
-            custom_model=None
+            custom_model=None,
+            token_cache: Optional[TokenCache] = None,
+            key_store: Optional[KeyStore] = None,
+            verify_executor: Optional[VerificationExecutor] = None,
+            observer: Optional[AuthObserver] = None,
+            rejection_cache: Optional[RejectionCache] = None,
+            prescreen: bool = False,
+            shared_cache: Optional[SharedCache] = None,
+            verify_backend: VerificationBackend = default_backend,
+            revocation_list: Optional[RevocationList] = None
     ):
         """
         Initialization
@@ -28,9 +56,31 @@ class CognitoAuth(object):
          configuration to apply.
         :param custom_model: Custom Pydantic model that should be used to parse
          token claims
+        :param token_cache: Optional `TokenCache` used to skip verification of
+         already verified tokens. Cache can be shared between `CognitoAuth`
+         objects, each of them uses its own namespace.
+        :param key_store: Optional `KeyStore` used to retrieve and cache JWKS,
+         shared default `KeyStore` is used if not provided.
+        :param verify_executor: Optional `VerificationExecutor` used to
+         offload signature verification from event loop.
+        :param observer: Optional `AuthObserver` which receives stage timings,
+         JWKS retrievals, cache lookups and failures. Observer receives only
+         events of this `CognitoAuth`, it is not registered on `key_store`.
+        :param rejection_cache: Optional `RejectionCache` used to reject
+         recently rejected tokens without verification.
+        :param prescreen: Check expiration, client id, token use and issuer
+         on unverified claims before signature verification.
+        :param shared_cache: Optional `SharedCache` used to share claims of
+         verified tokens between worker processes. Claims are shared only
+         between `CognitoAuth` objects with the same userpool configuration.
+        :param verify_backend: `VerificationBackend` used to verify token
+         signature, `JoserfcBackend` by default.
+        :param revocation_list: Optional `RevocationList` used to reject
+         revoked tokens, it is checked for cached tokens too.
         """
         self._userpool_name: str = userpool_name
         self._userpool: UserpoolModel
+        self._userpools: Dict[str, Dict]
         self._jwt_header_name: str
         self._jwt_header_prefix: str
         self._check_expiration: bool
@@ -38,6 +88,20 @@ class CognitoAuth(object):
             self._cognito_token_model = custom_model
         else:
             self._cognito_token_model = CognitoToken
+        self._token_cache: Optional[TokenCache] = token_cache
+        # unique for the lifetime of process, unlike `id`, so entries of
+        # discarded `CognitoAuth` are never returned to new one
+        self._cache_namespace: bytes = str(next(_cache_namespaces)).encode()
+        self._key_store: KeyStore = key_store or default_key_store
+        self._verify_executor: Optional[VerificationExecutor] = \
+            verify_executor
+        self._observer: Optional[AuthObserver] = observer
+        self._rejection_cache: Optional[RejectionCache] = rejection_cache
+        self._prescreen: bool = prescreen
+        self._shared_cache: Optional[SharedCache] = shared_cache
+        self._shared_cache_contexts: Dict[str, str] = {}
+        self._verify_backend: VerificationBackend = verify_backend
+        self._revocation_list: Optional[RevocationList] = revocation_list
 
         self._add_settings(settings)
 
@@ -54,6 +118,7 @@ class CognitoAuth(object):
             config="userpools",
             config_key=self._userpool_name
         )
+        self._userpools: Dict[str, Dict] = settings.userpools
         self._jwt_header_name: str = self._get_required_setting(
             settings=settings,
             config="jwt_header_name"
@@ -95,8 +160,8 @@ class CognitoAuth(object):
             elif config_key:
                 val = settings.__getattribute__(config)[config_key]
             elif not config_key and config == "userpools":
-                key = list(settings.__getattribute__(config).keys())[0]
-                val = UserpoolModel(**settings.__getattribute__(config)[key])
+                userpools = settings.__getattribute__(config)
+                val = UserpoolModel(**userpools[next(iter(userpools))])
             else:
                 val = settings.__getattribute__(config)
         except KeyError:
@@ -129,6 +194,65 @@ class CognitoAuth(object):
         except AttributeError:
             return default_value
 
+    async def startup(self) -> None:
+        """
+        Startup hook, creates HTTP client used to retrieve JWKS and loads keys
+        from snapshot file if configured.
+        """
+        await self._key_store.startup()
+
+    def _get_accepted_userpools(self) -> List[UserpoolModel]:
+        """
+        :return: Configurations of userpools which tokens are accepted
+        """
+        return [self._userpool]
+
+    async def warmup(self) -> None:
+        """
+        Retrieve and import keys for all accepted userpools concurrently, so
+        first authenticated requests don't wait for JWKS retrieval.
+        :return: None or `CognitoAuthError` if any userpool keys could not be
+         loaded.
+        """
+        try:
+            userpools = self._get_accepted_userpools()
+            await self._key_store.warmup(
+                (
+                    get_jwks_url(
+                        userpool.region,
+                        userpool.userpool_id,
+                        userpool.jwks_url
+                    )
+                    for userpool in userpools
+                ),
+                observer=self._observer
+            )
+        except Exception as error:
+            raise CognitoAuthError(
+                "Configuration error",
+                f"Failed to load keys for configured userpools: {error}"
+            ) from error
+
+    async def shutdown(self) -> None:
+        """
+        Shutdown hook, closes HTTP client used to retrieve JWKS.
+        """
+        await self._key_store.shutdown()
+
+    @asynccontextmanager
+    async def lifespan(self, app: Any) -> AsyncIterator[None]:
+        """
+        FastAPI lifespan which runs `startup` and `warmup` hooks on startup
+        and `shutdown` hook on shutdown.
+        :param app: FastAPI application
+        """
+        await self.startup()
+        try:
+            await self.warmup()
+            yield
+        finally:
+            await self.shutdown()
+
     def _verify_header(self, auth_header_value: str) -> str:
         """
         Check if value in `Authorization` header is valid and return that value
@@ -172,6 +296,14 @@ class CognitoAuth(object):
 
         return header_parts[1]
 
+    def _get_userpool(self, token: ParsedToken) -> UserpoolModel:
+        """
+        Userpool configuration which should be used to verify token
+        :param token: parsed token retrieved from `Authorization` header.
+        :return: UserpoolModel
+        """
+        return self._userpool
+
     async def _decode_token(self, token) -> Dict:
         """
         This method will use cognito_jwt_decode to decode token and verify if
@@ -180,35 +312,205 @@ class CognitoAuth(object):
         :return: decoded and verified cognito token or 401.
         """
         try:
+            parsed_token = parse_token(token)
+            userpool = self._get_userpool(parsed_token)
             return await decode_cognito_jwt(
-                token=token,
-                region=self._userpool.region,
-                userpool_id=self._userpool.userpool_id,
-                app_client_id=self._userpool.app_client_id,
+                token=parsed_token,
+                region=userpool.region,
+                userpool_id=userpool.userpool_id,
+                app_client_id=userpool.app_client_id,
                 testmode=not self._check_expiration,
-                jwks_url=self._userpool.jwks_url
+                jwks_url=userpool.jwks_url,
+                key_store=self._key_store,
+                executor=self._verify_executor,
+                issuer=userpool.issuer,
+                observer=self._observer,
+                prescreen=self._prescreen,
+                backend=self._verify_backend,
+                revocation_list=self._revocation_list
             )
         except TypeError:
+            self._report_failure("key_error")
             raise HTTPException(
                 status_code=401,
                 detail="Unable to get userpool key,"
                        " your userpool_id config might be incorrect."
             )
         except ValueError:
+            self._report_failure("malformed")
             raise HTTPException(
                 status_code=401,
                 detail="Malformed authentication token"
             )
         except Exception as error:
+            self._report_failure(getattr(error, "reason", "other"))
             raise HTTPException(
                 status_code=401,
                 detail="Error decoding JWT token."
             ) from error
 
-    async def auth_optional(self, request: HTTPConnection) -> Any:
+    async def _get_token_model(self, token: str) -> Any:
         """
-        Optional authentication, method will try to parse `Authorization` header
-        if present, else it will return None
+        Return token model for token, from `token_cache` if token was already
+        verified, else decode token and cache parsed model.
+        :param token: token retrieved from `Authorization` header.
+        :return: Token Model or 401.
+        """
+        if self._token_cache is not None:
+            token_model = self._token_cache.get(token, self._cache_namespace)
+            if self._observer is not None:
+                self._observer.on_cache("token", token_model is not None)
+            if token_model is not None:
+                if self._revocation_list is not None:
+                    self._check_revoked(token_model)
+                return token_model
+
+        if self._rejection_cache is not None:
+            rejection = self._rejection_cache.get(
+                token, self._cache_namespace
+            )
+            if self._observer is not None:
+                self._observer.on_cache("rejection", rejection is not None)
+            if rejection is not None:
+                reason, detail = rejection
+                self._report_failure(reason)
+                raise HTTPException(status_code=401, detail=detail)
+
+        payload = None
+        context = None
+        if self._shared_cache is not None:
+            context = self._get_shared_cache_context(token)
+            if context is not None:
+                payload = self._shared_cache.get_claims(token, context)
+            if self._observer is not None:
+                self._observer.on_cache("shared", payload is not None)
+        if payload is None:
+            payload = await self._verify_payload(token, context)
+        elif self._revocation_list is not None:
+            self._check_revoked(payload)
+
+        if self._observer is None:
+            token_model = self._cognito_token_model(**payload)
+        else:
+            start = time.perf_counter()
+            token_model = self._cognito_token_model(**payload)
+            self._observer.on_stage(
+                STAGE_MODEL, time.perf_counter() - start
+            )
+
+        if self._token_cache is not None:
+            self._token_cache.set(
+                token, token_model, payload["exp"], self._cache_namespace
+            )
+        return token_model
+
+    def _check_revoked(self, claims: Any) -> None:
+        """
+        Check if cached token is revoked, tokens which are verified are
+        checked by `decode_cognito_jwt`.
+        :param claims: token claims or token model
+        :return: None or 401.
+        """
+        if self._revocation_list.is_revoked(claims):
+            self._report_failure("revoked")
+            raise HTTPException(
+                status_code=401, detail="Error decoding JWT token."
+            )
+
+    def _get_shared_cache_context(self, token: str) -> Optional[str]:
+        """
+        Configuration which verifies token: JWKS URL, issuer, app client ids
+        and expiration check of its userpool. It is part of `SharedCache` key,
+        so claims verified by `CognitoAuth` with other configuration are
+        never reused. Context is built once per userpool.
+        :param token: token retrieved from `Authorization` header.
+        :return: Context or None if userpool can't be selected for token.
+        """
+        try:
+            userpool = self._get_userpool(parse_token(token))
+        except CognitoJWTException:
+            return None
+        issuer = get_issuer_url(
+            userpool.region, userpool.userpool_id, userpool.issuer
+        )
+        context = self._shared_cache_contexts.get(issuer)
+        if context is None:
+            app_client_id = userpool.app_client_id
+            if isinstance(app_client_id, str):
+                app_client_id = (app_client_id,)
+            context = "\n".join((
+                get_jwks_url(
+                    userpool.region, userpool.userpool_id, userpool.jwks_url
+                ),
+                issuer,
+                ",".join(sorted(app_client_id)),
+                str(self._check_expiration)
+            ))
+            self._shared_cache_contexts[issuer] = context
+        return context
+
+    async def _verify_payload(
+            self,
+            token: str,
+            context: Optional[str] = None
+    ) -> Dict:
+        """
+        Decode token with `_decode_token`, cache rejection or share verified
+        claims with other workers if configured.
+        :param token: token retrieved from `Authorization` header.
+        :param context: `SharedCache` context of token configuration.
+        :return: decoded and verified cognito token or 401.
+        """
+        try:
+            payload = await self._decode_token(token=token)
+        except CognitoJWTException as error:
+            raise HTTPException(status_code=401, detail=str(error))
+        except HTTPException as error:
+            reason = getattr(error.__cause__, "reason", None)
+            if self._rejection_cache is not None and reason and \
+                    reason not in TRANSIENT_REASONS:
+                self._rejection_cache.set(
+                    token, (reason, error.detail),
+                    namespace=self._cache_namespace
+                )
+            raise
+
+        if context is not None:
+            self._shared_cache.set_claims(
+                token, payload, payload["exp"], context
+            )
+        return payload
+
+    async def authenticate(self, request: HTTPConnection) -> Any:
+        """
+        Authenticate connection once per connection scope. Result(token model
+        or error) is memoized in `scope["state"]`, so other dependencies or
+        `CognitoAuthMiddleware` which authenticate the same connection reuse
+        it.
+        :param request: Incoming request or WebSocket connection
+        :return: Token Model, None if `Authorization` header is not present or
+         401.
+        """
+        memo = request.scope.setdefault("state", {}).setdefault(
+            AUTH_STATE_KEY, {}
+        )
+        result = memo.get(self)
+        if result is None:
+            try:
+                result = (await self._authenticate(request), None)
+            except HTTPException as error:
+                result = (None, error)
+            memo[self] = result
+
+        token_model, error = result
+        if error is not None:
+            raise error
+        return token_model
+
+    async def _authenticate(self, request: HTTPConnection) -> Any:
+        """
+        Parse `Authorization` header if present, verify it with
+        `_verify_header` and return token model.
         :param request: Incoming request
         :return: Token Model or None
         """
@@ -219,13 +521,55 @@ class CognitoAuth(object):
         if not authorization_header:
             return None
 
-        token = self._verify_header(auth_header_value=authorization_header)
+        if self._observer is None:
+            token = self._verify_header(auth_header_value=authorization_header)
+        else:
+            start = time.perf_counter()
+            try:
+                token = self._verify_header(
+                    auth_header_value=authorization_header
+                )
+            except HTTPException:
+                self._report_failure("invalid_header")
+                raise
+            self._observer.on_stage(
+                STAGE_HEADER, time.perf_counter() - start
+            )
 
-        try:
-            payload = await self._decode_token(token=token)
-        except CognitoJWTException as error:
-            raise HTTPException(status_code=401, detail=str(error))
-        return self._cognito_token_model(**payload)
+        return await self._get_token_model(token=token)
+
+    def get_token(self, request: HTTPConnection) -> str:
+        """
+        Get token from request `Authorization` header and verify header value
+        with `_verify_header`.
+        :param request: Incoming request or WebSocket connection
+        :return: token or 401.
+        """
+        return self._verify_header(
+            request.headers.get(self._jwt_header_name.lower())
+        )
+
+    async def verify_token(self, token: str) -> Any:
+        """
+        Verify raw token, e.g. token received in WebSocket message, and return
+        token model. Token and rejection caches are used if configured.
+        :param token: Raw JWT token
+        :return: Token Model or 401.
+        """
+        return await self._get_token_model(token=token)
+
+    def _report_failure(self, reason: str) -> None:
+        if self._observer is not None:
+            self._observer.on_failure(reason)
+
+    async def auth_optional(self, request: HTTPConnection) -> Any:
+        """
+        Optional authentication, method will try to parse `Authorization` header
+        if present, else it will return None
+        :param request: Incoming request
+        :return: Token Model or None
+        """
+        return await self.authenticate(request)
 
     async def auth_required(self, request: HTTPConnection) -> Any:
         """
@@ -234,12 +578,219 @@ class CognitoAuth(object):
         TokenModel with token payload data.
         :return: TokenModel with token payload or 401.
         """
-        token = self._verify_header(
-            request.headers.get(self._jwt_header_name.lower())
+        token_model = await self.authenticate(request)
+        if token_model is None:
+            # header is missing, `_verify_header` raises 401
+            self._report_failure("missing_header")
+            self._verify_header(None)
+        return token_model
+
+    def require_scopes(
+            self,
+            *scopes: str,
+            match_all: bool = True
+    ) -> Callable[[HTTPConnection], Awaitable[Any]]:
+        """
+        Create dependency which authenticates request like `auth_required`
+        and checks if token has required scopes. Required scopes are compiled
+        to frozenset once, when dependency is created.
+        :param scopes: Required scopes
+        :param match_all: If False, any of `scopes` is sufficient
+        :return: Dependency which returns TokenModel, 401 or 403.
+        """
+        return self._require(
+            frozenset(scopes), match_all, self._get_scope_set,
+            "insufficient_scope"
         )
 
-        try:
-            payload = await self._decode_token(token=token)
-        except CognitoJWTException as error:
-            raise HTTPException(status_code=401, detail=str(error))
-        return self._cognito_token_model(**payload)
+    def require_groups(
+            self,
+            *groups: str,
+            match_all: bool = True
+    ) -> Callable[[HTTPConnection], Awaitable[Any]]:
+        """
+        Create dependency which authenticates request like `auth_required`
+        and checks if user is member of required `cognito:groups`. Required
+        groups are compiled to frozenset once, when dependency is created.
+        :param groups: Required groups
+        :param match_all: If False, membership in any of `groups` is
+         sufficient
+        :return: Dependency which returns TokenModel, 401 or 403.
+        """
+        return self._require(
+            frozenset(groups), match_all, self._get_group_set,
+            "insufficient_groups"
+        )
+
+    def _require(
+            self,
+            required: FrozenSet[str],
+            match_all: bool,
+            get_values: Callable[[Any], FrozenSet[str]],
+            reason: str
+    ) -> Callable[[HTTPConnection], Awaitable[Any]]:
+        async def dependency(request: HTTPConnection) -> Any:
+            token_model = await self.auth_required(request)
+            values = get_values(token_model)
+            if required <= values if match_all else \
+                    not required.isdisjoint(values):
+                return token_model
+            self._report_failure(reason)
+            raise HTTPException(
+                status_code=403,
+                detail="Token does not have required permissions"
+            )
+
+        return dependency
+
+    @staticmethod
+    def _get_scope_set(token_model: Any) -> FrozenSet[str]:
+        """
+        Scopes of token model, `CognitoToken` and `CognitoClaims` cache parsed
+        scopes, for other models scopes are parsed from `scope` attribute.
+        """
+        scopes = getattr(token_model, "scope_set", None)
+        if scopes is None:
+            scope = getattr(token_model, "scope", None) or ""
+            scopes = frozenset(scope.split())
+        return scopes
+
+    @staticmethod
+    def _get_group_set(token_model: Any) -> FrozenSet[str]:
+        """
+        Groups of token model, `CognitoToken` and `CognitoClaims` cache parsed
+        groups, for other models groups are read from `cognito_groups`
+        attribute.
+        """
+        groups = getattr(token_model, "group_set", None)
+        if groups is None:
+            groups = frozenset(
+                getattr(token_model, "cognito_groups", None) or ()
+            )
+        return groups
+
+
+class CognitoMultiAuth(CognitoAuth):
+    """
+    Authentication which accepts tokens issued by any of configured userpools.
+    Userpool is selected by unverified `iss` claim through precomputed
+    issuer map, so each token is verified once, with keys of userpool that
+    issued it. Userpools with the same issuer and JWKS, e.g. entries for
+    different app clients of one userpool, accept app client ids of all of
+    them.
+    """
+
+    def __init__(
+            self,
+            settings: BaseSettings,
+            userpool_names: Optional[List[str]] = None,
+            **kwargs: Any
+    ):
+        """
+        Initialization
+        :param settings: BaseSettings object with configurations
+        :param userpool_names: Optional list of userpool names which tokens
+         should be accepted, all userpools from settings are accepted if not
+         provided.
+        :param kwargs: Other `CognitoAuth` params, e.g. `custom_model`,
+         `token_cache` or `key_store`.
+        """
+        self._userpool_names: Optional[List[str]] = userpool_names
+        self._issuers: Dict[str, List[str]]
+        self._userpool_models: Dict[str, UserpoolModel] = {}
+        super().__init__(
+            settings=settings,
+            userpool_name=userpool_names[0] if userpool_names else None,
+            **kwargs
+        )
+
+    def _add_settings(self, settings) -> None:
+        """
+        Set all required configurations and map issuer URL of each accepted
+        userpool to names of userpools with that issuer. Userpool
+        configuration is parsed on first use, so startup cost doesn't grow
+        with number of userpools.
+        :param settings: BaseSettings object where configurations should be
+         provided.
+        :return: None
+        """
+        super()._add_settings(settings)
+        self._issuers = {}
+        jwks_urls: Dict[str, str] = {}
+        for userpool_name in self._userpool_names or list(self._userpools):
+            try:
+                userpool = self._userpools[userpool_name]
+                issuer = get_issuer_url(
+                    userpool["region"],
+                    userpool["userpool_id"],
+                    userpool.get("issuer")
+                )
+                jwks_url = get_jwks_url(
+                    userpool["region"],
+                    userpool["userpool_id"],
+                    userpool.get("jwks_url")
+                )
+            except KeyError as error:
+                raise CognitoAuthError(
+                    "Configuration error",
+                    f"`{userpool_name}` userpool not found in `userpools` "
+                    f"from Settings object or it is missing {error}."
+                ) from error
+            if jwks_urls.setdefault(issuer, jwks_url) != jwks_url:
+                raise CognitoAuthError(
+                    "Configuration error",
+                    f"`{userpool_name}` userpool has the same issuer as "
+                    f"`{self._issuers[issuer][0]}` userpool, but different "
+                    f"JWKS URL."
+                )
+            self._issuers.setdefault(issuer, []).append(userpool_name)
+
+    def _get_accepted_userpools(self) -> List[UserpoolModel]:
+        """
+        :return: Configurations of userpools which tokens are accepted
+        """
+        return [
+            UserpoolModel(**self._userpools[userpool_names[0]])
+            for userpool_names in self._issuers.values()
+        ]
+
+    def _get_userpool(self, token: ParsedToken) -> UserpoolModel:
+        """
+        Find userpool configuration by unverified `iss` claim. Issuer is
+        checked again after signature verification.
+        :param token: parsed token retrieved from `Authorization` header.
+        :return: UserpoolModel
+        """
+        issuer = token.unverified_claims.get("iss")
+        if not isinstance(issuer, str):
+            raise CognitoJWTException(
+                "Token has missing or invalid issuer.", "invalid_issuer"
+            )
+        userpool = self._userpool_models.get(issuer)
+        if userpool is not None:
+            return userpool
+
+        userpool_names = self._issuers.get(issuer)
+        if userpool_names is None:
+            raise CognitoJWTException(
+                "Token was not issued by any of configured userpools.",
+                "invalid_issuer"
+            )
+        userpools = [
+            UserpoolModel(**self._userpools[userpool_name])
+            for userpool_name in userpool_names
+        ]
+        update: Dict[str, Any] = {"issuer": issuer}
+        if len(userpools) > 1:
+            update["app_client_id"] = [
+                app_client_id
+                for userpool in userpools
+                for app_client_id in (
+                    [userpool.app_client_id]
+                    if isinstance(userpool.app_client_id, str)
+                    else userpool.app_client_id
+                )
+            ]
+        userpool = userpools[0].model_copy(update=update)
+        self._userpool_models[issuer] = userpool
+        return userpool
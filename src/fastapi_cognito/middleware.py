@@ -0,0 +1,53 @@
+from typing import Iterable
+
+from fastapi.exceptions import HTTPException
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Scope, Receive, Send
+
+from .fastapi_cognito import CognitoAuth
+
+
+class CognitoAuthMiddleware(object):
+    """
+    Pure ASGI middleware which authenticates each HTTP and WebSocket
+    connection once and memoizes result in connection `scope["state"]`.
+    `CognitoAuth` dependencies reuse memoized result instead of parsing and
+    decoding token again. Middleware doesn't reject connections, errors are
+    raised by `auth_required` and `auth_optional` dependencies.
+    """
+
+    def __init__(
+            self,
+            app: ASGIApp,
+            cognito: CognitoAuth,
+            exclude_paths: Iterable[str] = (),
+            exclude_prefixes: Iterable[str] = ()
+    ):
+        """
+        Initialization
+        :param app: ASGI application
+        :param cognito: `CognitoAuth` object used to authenticate connections
+        :param exclude_paths: Paths which are not authenticated, e.g. health
+         checks.
+        :param exclude_prefixes: Path prefixes which are not authenticated.
+        """
+        self.app: ASGIApp = app
+        self._cognito: CognitoAuth = cognito
+        self._exclude_paths = frozenset(exclude_paths)
+        self._exclude_prefixes = tuple(exclude_prefixes)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] in ("http", "websocket") and not self._is_excluded(
+            scope["path"]
+        ):
+            try:
+                await self._cognito.authenticate(HTTPConnection(scope))
+            except HTTPException:
+                pass
+        await self.app(scope, receive, send)
+
+    def _is_excluded(self, path: str) -> bool:
+        return path in self._exclude_paths or (
+            bool(self._exclude_prefixes) and
+            path.startswith(self._exclude_prefixes)
+        )
@@ -1,4 +1,7 @@
-from typing import Union, List, Set, Optional, Tuple
+from functools import cached_property
+from typing import Union, List, Set, Optional, Tuple, Any, Callable, Dict, \
+    FrozenSet
+from urllib.parse import urlsplit
 
 from pydantic import BaseModel, HttpUrl, Field
 
@@ -8,6 +11,7 @@ class UserpoolModel(BaseModel):
     userpool_id: str
     app_client_id: Union[str, List[str], Set[str], Tuple[str]]
     jwks_url: Optional[str] = Field(default=None)
+    issuer: Optional[str] = Field(default=None)
 
 
 class CognitoToken(BaseModel):
@@ -23,3 +27,172 @@ class CognitoToken(BaseModel):
     jti: str
     client_id: str
     username: str
+    cognito_groups: Optional[List[str]] = Field(
+        default=None, alias="cognito:groups"
+    )
+
+    @cached_property
+    def scope_set(self) -> FrozenSet[str]:
+        """
+        Token scopes, parsed once per token model.
+        """
+        return frozenset(self.scope.split())
+
+    @cached_property
+    def group_set(self) -> FrozenSet[str]:
+        """
+        Token `cognito:groups`, parsed once per token model.
+        """
+        return frozenset(self.cognito_groups or ())
+
+
+def _validate_str(name: str, value: Any) -> str:
+    if not isinstance(value, str):
+        raise ValueError(f"Token claim `{name}` should be a valid string.")
+    return value
+
+
+def _validate_int(name: str, value: Any) -> int:
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or \
+            value != int(value):
+        raise ValueError(f"Token claim `{name}` should be a valid integer.")
+    return int(value)
+
+
+def _validate_str_list(name: str, value: Any) -> List[str]:
+    if not isinstance(value, list) or \
+            not all(isinstance(item, str) for item in value):
+        raise ValueError(f"Token claim `{name}` should be a list of strings.")
+    return value
+
+
+def _validate_url(name: str, value: Any) -> str:
+    url = urlsplit(_validate_str(name, value))
+    if url.scheme not in ("http", "https") or not url.netloc:
+        raise ValueError(f"Token claim `{name}` should be a valid URL.")
+    return value
+
+
+class Claim(object):
+    """
+    Token claim of `CognitoClaims`, validated on first access.
+    """
+    __slots__ = ("name", "alias", "validator", "required")
+
+    def __init__(
+            self,
+            validator: Callable[[str, Any], Any] = _validate_str,
+            alias: Optional[str] = None,
+            required: bool = True
+    ):
+        """
+        Initialization
+        :param validator: Function which validates claim value
+        :param alias: Name of the claim in token, defaults to attribute name
+        :param required: If claim is not required, missing claim is None
+        """
+        self.name: Optional[str] = None
+        self.alias: Optional[str] = alias
+        self.validator: Callable[[str, Any], Any] = validator
+        self.required: bool = required
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+        if self.alias is None:
+            self.alias = name
+
+    def __get__(self, instance: Optional["CognitoClaims"], owner: type) -> Any:
+        if instance is None:
+            return self
+        validated = instance._validated
+        if self.name in validated:
+            return validated[self.name]
+
+        value = instance._claims.get(self.alias)
+        if value is None:
+            if self.required:
+                raise ValueError(f"Token claim `{self.alias}` is missing.")
+        elif not instance._trusted:
+            value = self.validator(self.alias, value)
+        validated[self.name] = value
+        return value
+
+
+class CognitoClaims(object):
+    """
+    Lightweight alternative to `CognitoToken` model. Claims are kept in
+    verified claims dict and each claim is validated only when it is accessed
+    for the first time. Unlike `CognitoToken`, `iss` is `str`. Missing or
+    invalid claim doesn't fail authentication, it raises `ValueError` when it
+    is accessed.
+    """
+    __slots__ = ("_claims", "_validated")
+    _trusted: bool = False
+
+    origin_jti = Claim(required=False)
+    cognito_id = Claim(alias="sub")
+    event_id = Claim(required=False)
+    token_use = Claim()
+    scope = Claim()
+    auth_time = Claim(_validate_int)
+    iss = Claim(_validate_url)
+    exp = Claim(_validate_int)
+    iat = Claim(_validate_int)
+    jti = Claim()
+    client_id = Claim()
+    username = Claim()
+    cognito_groups = Claim(
+        _validate_str_list, alias="cognito:groups", required=False
+    )
+
+    def __init__(self, **claims: Any):
+        self._claims: Dict[str, Any] = claims
+        self._validated: Dict[str, Any] = {}
+
+    @property
+    def claims(self) -> Dict[str, Any]:
+        """
+        All token claims as they are in token.
+        """
+        return self._claims
+
+    @property
+    def scope_set(self) -> FrozenSet[str]:
+        """
+        Token scopes, parsed once per token claims.
+        """
+        scopes = self._validated.get("scope_set")
+        if scopes is None:
+            scopes = self._validated["scope_set"] = frozenset(
+                self.scope.split()
+            )
+        return scopes
+
+    @property
+    def group_set(self) -> FrozenSet[str]:
+        """
+        Token `cognito:groups`, parsed once per token claims.
+        """
+        groups = self._validated.get("group_set")
+        if groups is None:
+            groups = self._validated["group_set"] = frozenset(
+                self.cognito_groups or ()
+            )
+        return groups
+
+    def __getitem__(self, claim: str) -> Any:
+        return self._claims[claim]
+
+    def get(self, claim: str, default: Any = None) -> Any:
+        return self._claims.get(claim, default)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._claims!r})"
+
+
+class TrustedCognitoClaims(CognitoClaims):
+    """
+    `CognitoClaims` which values are not validated at all.
+    """
+    __slots__ = ()
+    _trusted: bool = True
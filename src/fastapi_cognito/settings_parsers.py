@@ -1,7 +1,6 @@
 import json
 from typing import Any, Dict
 
-import yaml
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -25,7 +24,12 @@ class CognitoSettings(BaseSettings):
         :param global_settings: global BaseSettings object.
         :return: mapped CognitoSettings class
         """
-        return cls(**global_settings.model_dump())
+        values = global_settings.model_dump(include=set(cls.model_fields))
+        if len(values) == len(cls.model_fields):
+            # all fields are provided, validate them without dumping whole
+            # global settings and reading environment again
+            return cls.model_validate(values)
+        return cls(**values)
 
     @classmethod
     def load_yaml(cls, yaml_file: str):
@@ -34,6 +38,7 @@ class CognitoSettings(BaseSettings):
         :param yaml_file: file that should contain all required configurations
         :return: mapped CognitoSettings class
         """
+        import yaml
         with open(yaml_file, "r") as file:
             return cls(**yaml.safe_load(file))
 
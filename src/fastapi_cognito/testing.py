@@ -0,0 +1,362 @@
+"""
+In-process fake Cognito userpools for tests, benchmarks and load tests.
+Userpool generates its own RSA keys, serves JWKS from file or in-memory
+`KeyStore` source and mints access and ID tokens, so no network, Cognito or
+emulator is needed.
+"""
+import base64
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from cryptography.hazmat.primitives.asymmetric.padding import PKCS1v15
+from cryptography.hazmat.primitives.asymmetric.rsa import RSAPrivateKey
+from cryptography.hazmat.primitives.hashes import SHA256
+from cryptography.hazmat.primitives.serialization import \
+    load_pem_private_key, Encoding, PrivateFormat, NoEncryption
+from joserfc import jwk
+
+from .cognito_jwt.constants import ISSUER_URL_TEMPLATE
+from .cognito_jwt.keys import KeyStore
+from .settings_parsers import CognitoSettings
+
+# Private keys loaded in process pool workers, by PEM
+__worker_keys: Dict[bytes, RSAPrivateKey] = {}
+
+
+def _base64url_encode(value: bytes) -> bytes:
+    return base64.urlsafe_b64encode(value).rstrip(b"=")
+
+
+def _sign(
+        private_key: RSAPrivateKey,
+        header_segment: bytes,
+        payload: Dict[str, Any]
+) -> str:
+    """
+    Sign token with RS256, header is encoded once per key.
+    """
+    signing_input = header_segment + b"." + _base64url_encode(
+        json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    )
+    signature = private_key.sign(signing_input, PKCS1v15(), SHA256())
+    return (signing_input + b"." + _base64url_encode(signature)).decode()
+
+
+def _sign_batch(
+        pem: bytes,
+        header_segment: bytes,
+        payloads: List[Dict[str, Any]]
+) -> List[str]:
+    private_key = __worker_keys.get(pem)
+    if private_key is None:
+        private_key = load_pem_private_key(pem, password=None)
+        __worker_keys[pem] = private_key
+    return [_sign(private_key, header_segment, payload) for payload in payloads]
+
+
+class FakeUserpool(object):
+    """
+    Fake userpool which signs tokens with locally generated RSA keys. Tokens
+    are signed directly with `cryptography`, RS256 signing with 2048 bits key
+    is the only significant cost, so minting speed scales with number of
+    `workers` used by `access_tokens` and `id_tokens`.
+    """
+
+    def __init__(
+            self,
+            region: str = "eu-central-1",
+            userpool_id: str = "eu-central-1_test",
+            app_client_id: str = "test-client-id",
+            kid: Optional[str] = None,
+            key_size: int = 2048,
+            expires_in: int = 3600
+    ):
+        """
+        Initialization
+        :param region: Userpool region
+        :param userpool_id: Userpool id, used in issuer URL
+        :param app_client_id: App client id of minted tokens
+        :param kid: `kid` of first signing key, generated if not provided
+        :param key_size: Size of generated RSA keys in bits
+        :param expires_in: Default token lifetime in seconds
+        """
+        self.region: str = region
+        self.userpool_id: str = userpool_id
+        self.app_client_id: str = app_client_id
+        self.expires_in: int = expires_in
+        self._key_size: int = key_size
+        self._keys: Dict[str, jwk.RSAKey] = {}
+        self._signers: Dict[str, Tuple[RSAPrivateKey, bytes]] = {}
+        self._key_stores: List[KeyStore] = []
+        self._jwks_paths: List[str] = []
+        self.kid: str = self.rotate_key(kid)
+
+    @property
+    def issuer(self) -> str:
+        return ISSUER_URL_TEMPLATE.format(self.region, self.userpool_id)
+
+    @property
+    def jwks_url(self) -> str:
+        """
+        URL of in-memory JWKS source registered with `register`.
+        """
+        return f"memory://{self.region}/{self.userpool_id}/jwks.json"
+
+    @property
+    def jwks(self) -> Dict[str, List[dict]]:
+        """
+        JWKS with public keys of all signing keys.
+        """
+        return {
+            "keys": [
+                key.as_dict(private=False) for key in self._keys.values()
+            ]
+        }
+
+    def rotate_key(
+            self,
+            kid: Optional[str] = None,
+            keep_previous: bool = True
+    ) -> str:
+        """
+        Generate new signing key, new tokens are signed with it. JWKS files
+        and registered `KeyStore` objects are updated.
+        :param kid: `kid` of new key, generated if not provided
+        :param keep_previous: Keep previous keys in JWKS, so tokens signed
+         with them are still valid.
+        :return: `kid` of new key
+        """
+        kid = kid or uuid.uuid4().hex
+        key = jwk.RSAKey.generate_key(
+            self._key_size,
+            parameters={"kid": kid, "alg": "RS256", "use": "sig"}
+        )
+        if not keep_previous:
+            self._keys.clear()
+            self._signers.clear()
+        self._keys[kid] = key
+        header = {"kid": kid, "alg": "RS256"}
+        self._signers[kid] = (
+            key.private_key,
+            _base64url_encode(json.dumps(header).encode("utf-8"))
+        )
+        self.kid = kid
+
+        for path in self._jwks_paths:
+            self._write_jwks(path)
+        for key_store in self._key_stores:
+            key_store.load(self.jwks_url, self.jwks["keys"])
+        return kid
+
+    def write_jwks(self, path: str) -> str:
+        """
+        Write JWKS to file, file is rewritten on each key rotation.
+        :return: `path` as `str`, can be used as `jwks_url`
+        """
+        path = str(path)
+        self._write_jwks(path)
+        if path not in self._jwks_paths:
+            self._jwks_paths.append(path)
+        return path
+
+    def _write_jwks(self, path: str) -> None:
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(self.jwks, file)
+        os.replace(tmp_path, path)
+
+    def register(self, key_store: KeyStore) -> str:
+        """
+        Serve JWKS from memory through `key_store`, keys are loaded
+        immediately and on each key rotation.
+        :return: `jwks_url` which should be used in userpool configuration
+        """
+        key_store.register_source(self.jwks_url, lambda: self.jwks["keys"])
+        key_store.load(self.jwks_url, self.jwks["keys"])
+        if key_store not in self._key_stores:
+            self._key_stores.append(key_store)
+        return self.jwks_url
+
+    def userpool_config(self, jwks_url: Optional[str] = None) -> Dict:
+        """
+        :param jwks_url: JWKS URL or path, in-memory source URL by default
+        :return: Userpool configuration for `CognitoSettings.userpools`
+        """
+        return {
+            "region": self.region,
+            "userpool_id": self.userpool_id,
+            "app_client_id": self.app_client_id,
+            "jwks_url": jwks_url or self.jwks_url,
+        }
+
+    def access_claims(
+            self,
+            expires_in: Optional[int] = None,
+            **claims: Any
+    ) -> Dict[str, Any]:
+        """
+        :return: Access token claims, `claims` override default values
+        """
+        now = int(time.time())
+        payload: Dict[str, Any] = {
+            "sub": str(uuid.uuid4()),
+            "token_use": "access",
+            "scope": "aws.cognito.signin.user.admin",
+            "auth_time": now,
+            "iss": self.issuer,
+            "exp": now + (self.expires_in if expires_in is None
+                          else expires_in),
+            "iat": now,
+            "jti": str(uuid.uuid4()),
+            "origin_jti": str(uuid.uuid4()),
+            "client_id": self.app_client_id,
+            "username": "user1@test.com",
+        }
+        payload.update(claims)
+        return payload
+
+    def id_claims(
+            self,
+            expires_in: Optional[int] = None,
+            **claims: Any
+    ) -> Dict[str, Any]:
+        """
+        :return: ID token claims, `claims` override default values
+        """
+        now = int(time.time())
+        payload: Dict[str, Any] = {
+            "sub": str(uuid.uuid4()),
+            "aud": self.app_client_id,
+            "token_use": "id",
+            "auth_time": now,
+            "iss": self.issuer,
+            "exp": now + (self.expires_in if expires_in is None
+                          else expires_in),
+            "iat": now,
+            "jti": str(uuid.uuid4()),
+            "origin_jti": str(uuid.uuid4()),
+            "cognito:username": "user1@test.com",
+            "email": "user1@test.com",
+            "email_verified": True,
+        }
+        payload.update(claims)
+        return payload
+
+    def sign(self, payload: Dict[str, Any], kid: Optional[str] = None) -> str:
+        """
+        Sign arbitrary claims with current key or key with `kid`.
+        """
+        private_key, header_segment = self._signers[kid or self.kid]
+        return _sign(private_key, header_segment, payload)
+
+    def access_token(
+            self,
+            expires_in: Optional[int] = None,
+            kid: Optional[str] = None,
+            **claims: Any
+    ) -> str:
+        """
+        Mint access token.
+        :param expires_in: Token lifetime in seconds, `exp` claim overrides it
+        :param kid: `kid` of signing key, current key by default
+        :param claims: Claims which override default values
+        """
+        return self.sign(self.access_claims(expires_in, **claims), kid)
+
+    def id_token(
+            self,
+            expires_in: Optional[int] = None,
+            kid: Optional[str] = None,
+            **claims: Any
+    ) -> str:
+        """
+        Mint ID token, params are the same as for `access_token`.
+        """
+        return self.sign(self.id_claims(expires_in, **claims), kid)
+
+    def access_tokens(
+            self,
+            count: int,
+            workers: Optional[int] = None,
+            expires_in: Optional[int] = None,
+            **claims: Any
+    ) -> List[str]:
+        """
+        Mint `count` access tokens with unique `sub`, `jti` and `origin_jti`
+        unless they are provided in `claims`.
+        :param workers: Number of processes used for signing, tokens are
+         signed in current process if not provided.
+        """
+        return self._sign_many([
+            self.access_claims(expires_in, **claims) for _ in range(count)
+        ], workers)
+
+    def id_tokens(
+            self,
+            count: int,
+            workers: Optional[int] = None,
+            expires_in: Optional[int] = None,
+            **claims: Any
+    ) -> List[str]:
+        """
+        Mint `count` ID tokens, params are the same as for `access_tokens`.
+        """
+        return self._sign_many([
+            self.id_claims(expires_in, **claims) for _ in range(count)
+        ], workers)
+
+    def _sign_many(
+            self,
+            payloads: List[Dict[str, Any]],
+            workers: Optional[int]
+    ) -> List[str]:
+        private_key, header_segment = self._signers[self.kid]
+        if not workers or workers < 2:
+            return [
+                _sign(private_key, header_segment, payload)
+                for payload in payloads
+            ]
+
+        pem = private_key.private_bytes(
+            Encoding.PEM, PrivateFormat.PKCS8, NoEncryption()
+        )
+        chunk_size = max(len(payloads) // (workers * 4), 1)
+        chunks = [
+            payloads[i:i + chunk_size]
+            for i in range(0, len(payloads), chunk_size)
+        ]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(
+                _sign_batch,
+                [pem] * len(chunks),
+                [header_segment] * len(chunks),
+                chunks
+            )
+            return [token for chunk in results for token in chunk]
+
+
+def cognito_settings(
+        userpools: Dict[str, FakeUserpool],
+        check_expiration: bool = True,
+        jwt_header_name: str = "Authorization",
+        jwt_header_prefix: str = "Bearer"
+) -> CognitoSettings:
+    """
+    `CognitoSettings` for fake userpools, JWKS is served from in-memory
+    sources, so userpools should be registered with `KeyStore` used by
+    `CognitoAuth`.
+    :param userpools: Fake userpools by name
+    """
+    return CognitoSettings(
+        check_expiration=check_expiration,
+        jwt_header_name=jwt_header_name,
+        jwt_header_prefix=jwt_header_prefix,
+        userpools={
+            name: userpool.userpool_config()
+            for name, userpool in userpools.items()
+        }
+    )
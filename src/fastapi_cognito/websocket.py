@@ -0,0 +1,294 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi.exceptions import HTTPException
+from starlette.websockets import WebSocket
+
+from .cognito_jwt.utils import parse_token
+from .fastapi_cognito import CognitoAuth
+
+logger = logging.getLogger(__name__)
+
+# Message types exchanged with client
+REFRESH_MESSAGE_TYPE = "refresh_token"
+REFRESHED_MESSAGE_TYPE = "token_refreshed"
+EXPIRING_MESSAGE_TYPE = "token_expiring"
+# WebSocket close code used when token is invalid or expired
+POLICY_VIOLATION = 1008
+
+# Scheduled actions
+_CHALLENGE = 0
+_EXPIRE = 1
+
+
+class WebSocketSession(object):
+    """
+    Authenticated WebSocket connection with subject and expiration of its
+    token.
+    """
+    __slots__ = ("websocket", "token_model", "sub", "exp", "generation")
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket: WebSocket = websocket
+        self.token_model: Any = None
+        self.sub: Optional[str] = None
+        self.exp: Optional[float] = None
+        self.generation: int = 0
+
+
+class WebSocketSessions(object):
+    """
+    Authenticates WebSocket connections once at connect and enforces token
+    expiration without verifying token on each message.
+
+    Expirations of all connections are kept in a single heap which is served
+    by one scheduler task, so cost per connection is a heap entry. Sockets
+    are closed with `close_code` when their token expires, or `on_expire` is
+    called instead if provided. If `challenge_before` is set, client receives
+    `{"type": "token_expiring", "exp": <exp>}` message that many seconds
+    before expiration. Client can send
+    `{"type": "refresh_token", "token": <token>}` message at any time to
+    re-authenticate connection in place. Refresh token must be issued for the
+    same user(`sub` claim) as the token connection was opened with, otherwise
+    connection is closed.
+    """
+
+    def __init__(
+            self,
+            cognito: CognitoAuth,
+            close_code: int = POLICY_VIOLATION,
+            challenge_before: float = 0,
+            on_expire: Optional[
+                Callable[[WebSocket, Any], Awaitable[None]]
+            ] = None,
+            check_expiration: Optional[bool] = None
+    ):
+        """
+        Initialization
+        :param cognito: `CognitoAuth` object used to verify tokens
+        :param close_code: WebSocket close code sent when token expires or
+         refreshed token is invalid.
+        :param challenge_before: Time in seconds before expiration when
+         client is notified that token is expiring, 0 disables notification.
+        :param on_expire: Optional coroutine function called with WebSocket
+         and token model instead of closing connection when token expires.
+        :param check_expiration: Set to False to disable expiration
+         scheduling, defaults to `check_expiration` setting of `cognito`.
+        """
+        self._cognito: CognitoAuth = cognito
+        self._close_code: int = close_code
+        self._challenge_before: float = challenge_before
+        self._on_expire = on_expire
+        self._check_expiration: bool = (
+            cognito._check_expiration if check_expiration is None
+            else check_expiration
+        )
+        self._sessions: Dict[int, WebSocketSession] = {}
+        self._heap: List[Tuple[float, int, int, int, int]] = []
+        self._counter = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    async def connect(
+            self,
+            websocket: WebSocket,
+            token: Optional[str] = None
+    ) -> Any:
+        """
+        Verify token, accept connection and schedule its expiration. If token
+        is invalid, connection is closed.
+        :param websocket: Incoming WebSocket connection
+        :param token: Optional raw token, by default it is read from
+         `Authorization` header.
+        :return: Token Model or None if connection is rejected
+        """
+        try:
+            if token is None:
+                token = self._cognito.get_token(websocket)
+            token_model = await self._cognito.verify_token(token)
+        except HTTPException:
+            await websocket.close(code=self._close_code)
+            return None
+
+        await websocket.accept()
+        session = WebSocketSession(websocket)
+        self._sessions[id(websocket)] = session
+        self._update(
+            session, parse_token(token).unverified_claims, token_model
+        )
+        return token_model
+
+    async def refresh(self, websocket: WebSocket, token: str) -> bool:
+        """
+        Re-authenticate connection with new token. Connection is closed if
+        token is invalid or it is issued for different user than current
+        token.
+        :param websocket: Connected WebSocket
+        :param token: Raw JWT token
+        :return: True if token is accepted
+        """
+        session = self._sessions.get(id(websocket))
+        if session is None:
+            return False
+        try:
+            token_model = await self._cognito.verify_token(token)
+        except HTTPException:
+            self.disconnect(websocket)
+            await self._close(websocket, "Invalid token")
+            return False
+        # token is verified, so its claims can be used as they are
+        claims = parse_token(token).unverified_claims
+        if claims.get("sub") != session.sub:
+            self.disconnect(websocket)
+            await self._close(websocket, "Token subject mismatch")
+            return False
+
+        self._update(session, claims, token_model)
+        await websocket.send_json(
+            {"type": REFRESHED_MESSAGE_TYPE, "exp": session.exp}
+        )
+        return True
+
+    async def handle_message(self, websocket: WebSocket, message: Any) -> bool:
+        """
+        Handle refresh message if `message` is one.
+        :param websocket: Connected WebSocket
+        :param message: Decoded JSON message received from client
+        :return: True if message is handled and should not be processed
+         further
+        """
+        if not isinstance(message, dict) or \
+                message.get("type") != REFRESH_MESSAGE_TYPE:
+            return False
+        token = message.get("token")
+        if not isinstance(token, str):
+            self.disconnect(websocket)
+            await self._close(websocket, "Invalid token")
+        else:
+            await self.refresh(websocket, token)
+        return True
+
+    def token_model(self, websocket: WebSocket) -> Any:
+        """
+        :return: Token Model of connection or None if it is not connected
+        """
+        session = self._sessions.get(id(websocket))
+        return session.token_model if session is not None else None
+
+    def disconnect(self, websocket: WebSocket) -> None:
+        """
+        Stop tracking connection, should be called when connection is closed.
+        Scheduled expiration entries are discarded lazily.
+        """
+        self._sessions.pop(id(websocket), None)
+
+    async def shutdown(self) -> None:
+        """
+        Stop scheduler task.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _update(
+            self,
+            session: WebSocketSession,
+            claims: Dict[str, Any],
+            token_model: Any
+    ) -> None:
+        session.token_model = token_model
+        session.sub = claims.get("sub")
+        # unique across sessions, so entries of closed connection never match
+        # new connection which reuses its `id`
+        session.generation = next(self._counter)
+        if not self._check_expiration:
+            return
+        exp = claims.get("exp")
+        if exp is None:
+            return
+        session.exp = exp
+        if self._challenge_before > 0:
+            self._schedule(session, exp - self._challenge_before, _CHALLENGE)
+        self._schedule(session, exp, _EXPIRE)
+
+    def _schedule(
+            self,
+            session: WebSocketSession,
+            deadline: float,
+            action: int
+    ) -> None:
+        entry = (
+            deadline, next(self._counter), id(session.websocket),
+            session.generation, action
+        )
+        heapq.heappush(self._heap, entry)
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        elif self._heap[0] is entry:
+            # new entry is earlier than the one scheduler waits for
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            due: List[Tuple[WebSocketSession, int]] = []
+            timeout: Optional[float] = None
+            now = time.time()
+            while self._heap:
+                deadline, _, session_id, generation, action = self._heap[0]
+                session = self._sessions.get(session_id)
+                if session is None or session.generation != generation:
+                    heapq.heappop(self._heap)
+                elif deadline <= now:
+                    heapq.heappop(self._heap)
+                    due.append((session, action))
+                else:
+                    timeout = deadline - now
+                    break
+
+            if due:
+                await asyncio.gather(
+                    *(self._run_action(session, action)
+                      for session, action in due),
+                    return_exceptions=True
+                )
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run_action(self, session: WebSocketSession, action: int):
+        websocket = session.websocket
+        try:
+            if action == _CHALLENGE:
+                await websocket.send_json(
+                    {"type": EXPIRING_MESSAGE_TYPE, "exp": session.exp}
+                )
+                return
+
+            self.disconnect(websocket)
+            if self._on_expire is not None:
+                await self._on_expire(websocket, session.token_model)
+            else:
+                await self._close(websocket, "Token expired")
+        except Exception as error:
+            logger.debug(f"Failed to notify expired WebSocket: {error}")
+
+    async def _close(self, websocket: WebSocket, reason: str) -> None:
+        try:
+            await websocket.close(code=self._close_code, reason=reason)
+        except Exception as error:
+            logger.debug(f"Failed to close WebSocket: {error}")
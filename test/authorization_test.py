@@ -0,0 +1,58 @@
+from fastapi import FastAPI, Depends
+from fastapi.testclient import TestClient
+
+from fastapi_cognito import CognitoAuth, CognitoClaims
+from fastapi_cognito.cognito_jwt.keys import KeyStore
+from utils import tokens
+from utils.factories import create_settings
+
+
+def create_client(tmp_path, custom_model=None) -> TestClient:
+    cognito = CognitoAuth(
+        settings=create_settings(tmp_path),
+        key_store=KeyStore(),
+        custom_model=custom_model
+    )
+    app = FastAPI()
+
+    @app.get("/orders")
+    def orders(auth=Depends(cognito.require_scopes("orders/read"))):
+        return {"username": auth.username}
+
+    @app.get("/admin")
+    def admin(auth=Depends(
+        cognito.require_groups("admin", "staff", match_all=False)
+    )):
+        return {"username": auth.username}
+
+    return TestClient(app=app)
+
+
+def get(t_client: TestClient, path: str, **claims):
+    token = tokens.generate_access_token(**claims)
+    return t_client.get(path, headers={"Authorization": f"Bearer {token}"})
+
+
+def test_require_scopes(tmp_path):
+    for custom_model in (None, CognitoClaims):
+        t_client = create_client(tmp_path, custom_model)
+        resp = get(t_client, "/orders", scope="openid orders/read")
+        assert resp.status_code == 200
+        assert resp.json() == {"username": "user1@test.com"}
+
+        resp = get(t_client, "/orders", scope="openid orders/write")
+        assert resp.status_code == 403
+
+        assert t_client.get("/orders").status_code == 401
+
+
+def test_require_groups(tmp_path):
+    for custom_model in (None, CognitoClaims):
+        t_client = create_client(tmp_path, custom_model)
+        resp = get(t_client, "/admin", **{"cognito:groups": ["staff"]})
+        assert resp.status_code == 200
+
+        resp = get(t_client, "/admin", **{"cognito:groups": ["users"]})
+        assert resp.status_code == 403
+
+        assert get(t_client, "/admin").status_code == 403
@@ -0,0 +1,103 @@
+import base64
+import hashlib
+import hmac
+import json
+
+import pytest
+from joserfc import jwk, jwt
+
+from fastapi_cognito.cognito_jwt.backends import JoserfcBackend, \
+    RS256Backend, VerificationBackend
+from fastapi_cognito.cognito_jwt.exceptions import CognitoJWTException
+from fastapi_cognito.cognito_jwt.keys import KeySet
+from fastapi_cognito.cognito_jwt.utils import ParsedToken
+from utils import tokens
+
+BACKENDS = [JoserfcBackend(), RS256Backend()]
+
+
+def b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def unsigned_token(header: dict, sign=lambda signing_input: b"") -> str:
+    valid_token = tokens.generate_access_token()
+    payload = valid_token.split(".")[1]
+    signing_input = f"{b64(json.dumps(header).encode())}.{payload}"
+    return f"{signing_input}.{b64(sign(signing_input.encode()))}"
+
+
+@pytest.fixture
+def public_key(tmp_path) -> jwk.Key:
+    with open(tokens.write_jwks(tmp_path / "jwks.json")) as file:
+        return KeySet(json.load(file)["keys"]).get(tokens.KID)
+
+
+def assert_rejected(backend, token: ParsedToken, public_key, reason: str):
+    with pytest.raises(CognitoJWTException) as error:
+        backend.verify(token, public_key)
+    assert error.value.reason == reason
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_valid_signature(backend, public_key):
+    token = ParsedToken(tokens.generate_access_token())
+    assert backend.verify(token, public_key)["username"] == "user1@test.com"
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_bad_signature(backend, public_key):
+    header, payload, signature = tokens.generate_access_token().split(".")
+    token = ParsedToken(f"{header}.{payload}.{signature[::-1]}")
+    assert_rejected(backend, token, public_key, "bad_signature")
+
+    other_key = jwk.RSAKey.generate_key(2048)
+    token = ParsedToken(jwt.encode(
+        {"alg": "RS256", "kid": tokens.KID}, {"sub": "user"}, other_key
+    ))
+    assert_rejected(backend, token, public_key, "bad_signature")
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_alg_none_rejected(backend, public_key):
+    token = ParsedToken(unsigned_token({"alg": "none", "kid": tokens.KID}))
+    assert_rejected(backend, token, public_key, "malformed")
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_wrong_alg_rejected(backend, public_key):
+    # HMAC signed with public key as secret, classic algorithm confusion
+    secret = json.dumps(public_key.as_dict()).encode()
+    token = ParsedToken(unsigned_token(
+        {"alg": "HS256", "kid": tokens.KID},
+        lambda data: hmac.new(secret, data, hashlib.sha256).digest()
+    ))
+    assert_rejected(backend, token, public_key, "malformed")
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_crit_header_rejected(backend, public_key):
+    token = ParsedToken(unsigned_token(
+        {"alg": "RS256", "kid": tokens.KID, "crit": ["exp"]}
+    ))
+    assert_rejected(backend, token, public_key, "malformed")
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_unusable_key_rejected(backend, public_key):
+    token = ParsedToken(tokens.generate_access_token())
+    encryption_key = jwk.RSAKey.import_key(
+        dict(public_key.as_dict(), use="enc")
+    )
+    assert_rejected(backend, token, encryption_key, "bad_signature")
+
+    ec_key = jwk.ECKey.generate_key("P-256", parameters={"kid": tokens.KID})
+    assert_rejected(backend, token, ec_key, "malformed")
+
+
+def test_backend_without_verify_rejected():
+    class IncompleteBackend(VerificationBackend):
+        pass
+
+    with pytest.raises(TypeError):
+        IncompleteBackend()
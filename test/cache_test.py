@@ -0,0 +1,111 @@
+import pytest
+from fastapi.exceptions import HTTPException
+
+from fastapi_cognito import TokenCache, RejectionCache, cache
+from fastapi_cognito.cache import ENTRY_OVERHEAD
+from utils import tokens
+from utils.factories import create_cognito, authenticate
+
+
+def test_token_cache_hit(tmp_path):
+    token_cache = TokenCache(max_entries=10)
+    cognito = create_cognito(tmp_path, token_cache=token_cache)
+    token = tokens.generate_access_token()
+    first = authenticate(cognito, token)
+    assert authenticate(cognito, token) is first
+    assert cognito.decoded == 1
+    assert token_cache.stats["hits"] == 1
+
+
+def test_rejection_cache_hit(tmp_path):
+    rejection_cache = RejectionCache(max_entries=10)
+    cognito = create_cognito(tmp_path, rejection_cache=rejection_cache)
+    token = tokens.generate_access_token(exp=1)
+    for _ in range(3):
+        try:
+            authenticate(cognito, token)
+        except HTTPException as error:
+            assert error.status_code == 401
+        else:
+            raise AssertionError("Expired token accepted.")
+    assert cognito.decoded == 1
+    assert rejection_cache.stats["hits"] == 2
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(cache, "time", clock)
+    return clock
+
+
+def test_token_cache_lru_eviction(clock):
+    token_cache = TokenCache(max_entries=2)
+    token_cache.set("first", 1, exp=2000)
+    token_cache.set("second", 2, exp=2000)
+    assert token_cache.get("first") == 1
+    token_cache.set("third", 3, exp=2000)
+
+    # least recently used entry is evicted
+    assert token_cache.get("second") is None
+    assert (token_cache.get("first"), token_cache.get("third")) == (1, 3)
+    assert token_cache.stats["evictions"] == 1
+
+
+def test_token_cache_max_bytes(clock):
+    token = "x" * 1000
+    token_cache = TokenCache(max_bytes=3 * (ENTRY_OVERHEAD + len(token)))
+    for i in range(5):
+        token_cache.set(f"{i}{token[1:]}", i, exp=2000)
+    assert len(token_cache) == 3
+    assert token_cache.size <= 3 * (ENTRY_OVERHEAD + len(token))
+    assert token_cache.get(f"4{token[1:]}") == 4
+
+
+def test_token_cache_expiration(clock):
+    token_cache = TokenCache(ttl=10)
+    token_cache.set("short", 1, exp=1005)
+    token_cache.set("long", 2, exp=2000)
+    token_cache.set("expired", 3, exp=1000)
+    assert len(token_cache) == 2
+
+    # entry expires at token `exp`
+    clock.now = 1005
+    assert token_cache.get("short") is None
+    assert token_cache.get("long") == 2
+    # or after `ttl`, whichever comes first
+    clock.now = 1010
+    assert token_cache.get("long") is None
+    assert token_cache.stats["expirations"] == 2
+    assert token_cache.size == 0
+
+
+def test_token_cache_shared_between_userpools(tmp_path):
+    token_cache = TokenCache()
+    rejection_cache = RejectionCache()
+    userpools = {"eu": {}, "us": {"app_client_id": "us-client-id"}}
+    cognito_eu = create_cognito(
+        tmp_path, userpools,
+        token_cache=token_cache, rejection_cache=rejection_cache
+    )
+    cognito_us = create_cognito(
+        tmp_path, userpools, userpool_name="us",
+        token_cache=token_cache, rejection_cache=rejection_cache
+    )
+    token = tokens.generate_access_token()
+
+    for _ in range(2):
+        with pytest.raises(HTTPException):
+            authenticate(cognito_us, token)
+        # rejection by one userpool doesn't reject token for another and
+        # token verified by one userpool is not accepted by another
+        assert authenticate(cognito_eu, token).username == "user1@test.com"
+    assert (cognito_eu.decoded, cognito_us.decoded) == (1, 1)
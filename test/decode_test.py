@@ -0,0 +1,134 @@
+import asyncio
+import base64
+import json
+
+import pytest
+
+from fastapi_cognito.cognito_jwt.decode import decode_cognito_jwt, \
+    decode_cognito_jwts
+from fastapi_cognito.cognito_jwt.exceptions import CognitoJWTException
+from fastapi_cognito.cognito_jwt.keys import KeyStore
+from utils import tokens
+
+
+def test_batch_results_per_token(tmp_path):
+    jwks_url = tokens.write_jwks(tmp_path / "jwks.json")
+    token_list = [
+        tokens.generate_access_token(username="user1"),
+        "not-a-token",
+        tokens.generate_access_token(exp=1),
+        tokens.generate_access_token(client_id="other-client"),
+        tokens.generate_access_token(username="user2"),
+    ]
+
+    results = asyncio.run(decode_cognito_jwts(
+        token_list,
+        region=tokens.REGION,
+        userpool_id=tokens.USERPOOL_ID,
+        app_client_id=tokens.APP_CLIENT_ID,
+        jwks_url=jwks_url,
+        key_store=KeyStore()
+    ))
+
+    assert results[0]["username"] == "user1"
+    assert all(
+        isinstance(result, CognitoJWTException) for result in results[1:4]
+    )
+    assert results[4]["username"] == "user2"
+
+
+class FailingKeyStore(KeyStore):
+    async def get_key(self, keys_url, kid, observer=None):
+        raise AssertionError("Prescreened token reached key retrieval.")
+
+
+def test_prescreen_rejects_before_verification(tmp_path):
+    jwks_url = tokens.write_jwks(tmp_path / "jwks.json")
+    token_list = [
+        tokens.generate_access_token(exp=1),
+        tokens.generate_access_token(client_id="other-client"),
+        tokens.generate_access_token(token_use="refresh"),
+    ]
+
+    results = asyncio.run(decode_cognito_jwts(
+        token_list,
+        region=tokens.REGION,
+        userpool_id=tokens.USERPOOL_ID,
+        app_client_id=tokens.APP_CLIENT_ID,
+        jwks_url=jwks_url,
+        key_store=FailingKeyStore(),
+        prescreen=True
+    ))
+
+    assert [result.reason for result in results] == [
+        "expired", "invalid_client", "invalid_token_use"
+    ]
+
+
+def test_prescreen_default_issuer(monkeypatch):
+    monkeypatch.delenv("AWS_COGNITO_KEYS_URL", raising=False)
+    token = tokens.generate_access_token(
+        iss=f"https://cognito-idp.{tokens.REGION}.amazonaws.com/other-pool"
+    )
+
+    # keys from default Cognito JWKS URL are never retrieved for foreign iss
+    with pytest.raises(CognitoJWTException) as error:
+        asyncio.run(decode_cognito_jwt(
+            token,
+            region=tokens.REGION,
+            userpool_id=tokens.USERPOOL_ID,
+            app_client_id=tokens.APP_CLIENT_ID,
+            key_store=FailingKeyStore(),
+            prescreen=True
+        ))
+    assert error.value.reason == "invalid_issuer"
+
+
+@pytest.mark.parametrize("prescreen", [True, False])
+def test_invalid_expiration_malformed(tmp_path, prescreen):
+    jwks_url = tokens.write_jwks(tmp_path / "jwks.json")
+    token_list = [
+        tokens.generate_access_token(exp="tomorrow"),
+        tokens.generate_access_token(exp=None),
+        tokens.generate_access_token(exp=True),
+    ]
+
+    results = asyncio.run(decode_cognito_jwts(
+        token_list,
+        region=tokens.REGION,
+        userpool_id=tokens.USERPOOL_ID,
+        app_client_id=tokens.APP_CLIENT_ID,
+        jwks_url=jwks_url,
+        key_store=KeyStore(),
+        prescreen=prescreen
+    ))
+
+    assert [result.reason for result in results] == ["malformed"] * 3
+
+
+def with_header(token: str, header) -> str:
+    segment = base64.urlsafe_b64encode(json.dumps(header).encode())
+    return segment.rstrip(b"=").decode() + token[token.index("."):]
+
+
+def test_batch_malformed_header(tmp_path):
+    jwks_url = tokens.write_jwks(tmp_path / "jwks.json")
+    token = tokens.generate_access_token()
+    token_list = [
+        token,
+        with_header(token, {"alg": "RS256", "kid": ["x"]}),
+        with_header(token, ["RS256"]),
+        with_header(token, {"alg": "RS256"}),
+    ]
+
+    results = asyncio.run(decode_cognito_jwts(
+        token_list,
+        region=tokens.REGION,
+        userpool_id=tokens.USERPOOL_ID,
+        app_client_id=tokens.APP_CLIENT_ID,
+        jwks_url=jwks_url,
+        key_store=KeyStore()
+    ))
+
+    assert results[0]["username"] == "user1@test.com"
+    assert [result.reason for result in results[1:]] == ["malformed"] * 3
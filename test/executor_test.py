@@ -0,0 +1,107 @@
+import asyncio
+import json
+import threading
+
+import pytest
+from joserfc import jwk
+
+from fastapi_cognito.cognito_jwt import executor as executor_module
+from fastapi_cognito.cognito_jwt.backends import JoserfcBackend, RS256Backend
+from fastapi_cognito.cognito_jwt.exceptions import CognitoJWTException
+from fastapi_cognito.cognito_jwt.executor import VerificationExecutor
+from fastapi_cognito.cognito_jwt.keys import KeySet
+from fastapi_cognito.cognito_jwt.utils import ParsedToken
+from utils import tokens
+
+
+class RecordingBackend(JoserfcBackend):
+    def __init__(self):
+        self.threads = []
+
+    def verify(self, token, public_key):
+        self.threads.append(threading.current_thread().name)
+        return super().verify(token, public_key)
+
+
+@pytest.fixture
+def public_key(tmp_path) -> jwk.Key:
+    with open(tokens.write_jwks(tmp_path / "jwks.json")) as file:
+        return KeySet(json.load(file)["keys"]).get(tokens.KID)
+
+
+def bad_signature_token() -> ParsedToken:
+    header, payload, signature = tokens.generate_access_token().split(".")
+    return ParsedToken(f"{header}.{payload}.{signature[:-8]}AAAAAAAA")
+
+
+def test_inline_when_idle(public_key):
+    executor = VerificationExecutor(inline_threshold=1, inline_window=60)
+    backend = RecordingBackend()
+    token = ParsedToken(tokens.generate_access_token())
+
+    async def verify():
+        # second verification in the same window exceeds threshold
+        for _ in range(2):
+            await executor.verify(token, public_key, backend)
+
+    asyncio.run(verify())
+    executor.shutdown()
+    assert backend.threads[0] == threading.current_thread().name
+    assert backend.threads[1].startswith("fastapi-cognito-verify")
+
+
+def test_thread_pool(public_key):
+    executor = VerificationExecutor(max_workers=2, inline_threshold=0)
+    backend = RecordingBackend()
+    token_list = [
+        ParsedToken(tokens.generate_access_token()) for _ in range(4)
+    ] + [bad_signature_token()]
+
+    async def verify():
+        return await asyncio.gather(
+            *(executor.verify(token, public_key, backend)
+              for token in token_list),
+            return_exceptions=True
+        )
+
+    results = asyncio.run(verify())
+    executor.shutdown()
+    assert all(claims["username"] == "user1@test.com" for claims in results[:4])
+    assert results[4].reason == "bad_signature"
+    assert all(
+        name.startswith("fastapi-cognito-verify") for name in backend.threads
+    )
+
+
+@pytest.mark.parametrize("backend", [JoserfcBackend(), RS256Backend()])
+def test_process_pool(backend, public_key):
+    executor = VerificationExecutor(
+        max_workers=1, use_processes=True, inline_threshold=0
+    )
+    token = ParsedToken(tokens.generate_access_token())
+
+    async def verify(parsed_token):
+        return await executor.verify(parsed_token, public_key, backend)
+
+    try:
+        assert asyncio.run(verify(token))["username"] == "user1@test.com"
+        # error raised in worker process is re-raised with its reason
+        with pytest.raises(CognitoJWTException) as error:
+            asyncio.run(verify(bad_signature_token()))
+        assert error.value.reason == "bad_signature"
+    finally:
+        executor.shutdown()
+
+
+def test_worker_imports_key_once(public_key):
+    worker_keys = getattr(executor_module, "__worker_keys")
+    worker_keys.clear()
+    key_dict = public_key.as_dict(private=False)
+    for _ in range(3):
+        claims = executor_module._verify_with_jwk(
+            ParsedToken(tokens.generate_access_token()),
+            key_dict,
+            JoserfcBackend()
+        )
+        assert claims["username"] == "user1@test.com"
+    assert list(worker_keys) == [(tokens.KID, key_dict["n"])]
@@ -0,0 +1,15 @@
+import json
+import subprocess
+import sys
+
+# Modules which should be imported only on code path that needs them
+LAZY_MODULES = ("yaml", "httpx", "aiofile", "multiprocessing")
+
+
+def test_optional_dependencies_not_imported():
+    output = subprocess.check_output([
+        sys.executable, "-c",
+        "import json, sys; import fastapi_cognito; "
+        f"print(json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))"
+    ])
+    assert json.loads(output) == []
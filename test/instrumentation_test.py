@@ -0,0 +1,60 @@
+from fastapi import FastAPI, Depends
+from fastapi.testclient import TestClient
+
+from fastapi_cognito import CognitoAuth, CognitoToken, TokenCache
+from fastapi_cognito.cognito_jwt.instrumentation import MetricsObserver
+from fastapi_cognito.cognito_jwt.keys import KeyStore
+from utils import tokens
+from utils.factories import authenticate, create_settings
+
+
+def test_metrics_observer(tmp_path):
+    observer = MetricsObserver()
+    cognito = CognitoAuth(
+        settings=create_settings(tmp_path),
+        key_store=KeyStore(),
+        token_cache=TokenCache(),
+        observer=observer
+    )
+    app = FastAPI()
+
+    @app.get("/")
+    def hello_world(auth: CognitoToken = Depends(cognito.auth_required)):
+        return {"message": "Hello world"}
+
+    t_client = TestClient(app=app)
+    token = tokens.generate_access_token()
+    for _ in range(3):
+        t_client.get("/", headers={"Authorization": f"Bearer {token}"})
+    expired_token = tokens.generate_access_token(exp=1)
+    t_client.get("/", headers={"Authorization": f"Bearer {expired_token}"})
+    t_client.get("/")
+
+    assert observer.jwks_fetches == {"success": 1}
+    assert observer.cache_lookups[("token", "hit")] == 2
+    assert observer.cache_lookups[("token", "miss")] == 2
+    assert observer.stage_duration["verify"].count == 2
+    assert observer.stage_duration["model"].count == 1
+    assert observer.failures == {"expired": 1, "missing_header": 1}
+    assert 'fastapi_cognito_failures_total{reason="expired"} 1' in \
+        observer.render()
+
+
+def test_observer_not_shared_between_cognito_auths(tmp_path):
+    key_store = KeyStore()
+    observers = [MetricsObserver(), MetricsObserver()]
+    cognitos = [
+        CognitoAuth(
+            settings=create_settings(tmp_path),
+            key_store=key_store,
+            observer=observer
+        )
+        for observer in observers
+    ]
+    authenticate(cognitos[0], tokens.generate_access_token())
+
+    assert observers[0].jwks_fetches == {"success": 1}
+    assert observers[0].cache_lookups[("jwks", "miss")] == 1
+    assert observers[1].jwks_fetches == {}
+    assert observers[1].cache_lookups == {}
+    assert key_store._observers == []
@@ -0,0 +1,267 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+from joserfc import jwk
+
+from fastapi_cognito.cognito_jwt.decode import decode_cognito_jwt
+from fastapi_cognito.cognito_jwt.exceptions import CognitoJWTException
+from fastapi_cognito.cognito_jwt.keys import KeyStore
+from fastapi_cognito.testing import FakeUserpool
+from utils import tokens
+from utils.factories import CountingKeyStore
+
+
+def test_concurrent_cold_start_single_fetch(tmp_path):
+    jwks_url = tokens.write_jwks(tmp_path / "jwks.json")
+    key_store = CountingKeyStore()
+    token = tokens.generate_access_token()
+
+    async def decode_concurrently():
+        return await asyncio.gather(*(
+            decode_cognito_jwt(
+                token=token,
+                region=tokens.REGION,
+                userpool_id=tokens.USERPOOL_ID,
+                app_client_id=tokens.APP_CLIENT_ID,
+                jwks_url=jwks_url,
+                key_store=key_store
+            )
+            for _ in range(100)
+        ))
+
+    results = asyncio.run(decode_concurrently())
+    assert len(results) == 100
+    assert all(claims["username"] == "user1@test.com" for claims in results)
+    assert key_store.fetches == 1
+
+
+def test_unknown_kid_refetch_is_rate_limited(tmp_path):
+    jwks_url = tokens.write_jwks(tmp_path / "jwks.json")
+    key_store = CountingKeyStore(min_refetch_interval=60)
+
+    async def get_keys():
+        await key_store.get_key(jwks_url, tokens.KID)
+        for _ in range(10):
+            try:
+                await key_store.get_key(jwks_url, "unknown-kid")
+            except Exception:
+                pass
+
+    asyncio.run(get_keys())
+    assert key_store.fetches == 1
+
+
+def test_injected_http_client(tmp_path):
+    jwks_url = tokens.write_jwks(tmp_path / "jwks.json")
+    with open(jwks_url) as file:
+        jwks = json.load(file)
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json=jwks)
+
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    key_store = KeyStore(http_client=http_client)
+
+    async def get_key():
+        await key_store.startup()
+        key = await key_store.get_key("https://jwks.test/jwks.json", tokens.KID)
+        await key_store.shutdown()
+        return key
+
+    assert asyncio.run(get_key()) is not None
+    assert len(requests) == 1
+    assert not http_client.is_closed
+
+
+def test_snapshot_loaded_on_startup(tmp_path):
+    jwks_url = tokens.write_jwks(tmp_path / "jwks.json")
+    snapshot_path = str(tmp_path / "snapshot.json")
+
+    async def warmup(key_store):
+        await key_store.startup()
+        await key_store.warmup([jwks_url])
+        await key_store.shutdown()
+
+    key_store = CountingKeyStore(snapshot_path=snapshot_path)
+    asyncio.run(warmup(key_store))
+    assert key_store.fetches == 1
+
+    restarted_key_store = CountingKeyStore(snapshot_path=snapshot_path)
+    asyncio.run(warmup(restarted_key_store))
+    assert restarted_key_store.fetches == 0
+    assert restarted_key_store.get_key_set(jwks_url).get(tokens.KID)
+
+
+def test_file_jwks_reloaded_on_change(tmp_path):
+    jwks_path = tmp_path / "jwks.json"
+    jwks_url = tokens.write_jwks(jwks_path)
+    key_store = CountingKeyStore(file_poll_interval=0)
+    rotated_key = jwk.RSAKey.generate_key(
+        2048, parameters={"kid": "rotated-kid", "alg": "RS256", "use": "sig"}
+    )
+
+    async def get_keys():
+        for _ in range(10):
+            await key_store.get_key(jwks_url, tokens.KID)
+        assert key_store.fetches == 1
+
+        with open(jwks_path, "w") as file:
+            json.dump({"keys": [rotated_key.as_dict(private=False)]}, file)
+        await key_store.get_key(jwks_url, "rotated-kid")
+        assert key_store.fetches == 2
+
+    asyncio.run(get_keys())
+
+
+def test_bounded_key_store_eviction():
+    userpools = [
+        FakeUserpool(userpool_id=f"{tokens.USERPOOL_ID}{i}") for i in range(30)
+    ]
+    key_store = KeyStore(max_pools=10, eviction="lfu")
+
+    async def get_keys():
+        for userpool in userpools:
+            key_store.register_source(
+                userpool.jwks_url, lambda pool=userpool: pool.jwks["keys"]
+            )
+        hot = userpools[0]
+        for _ in range(5):
+            await key_store.get_key(hot.jwks_url, hot.kid)
+        for userpool in userpools:
+            await key_store.get_key(userpool.jwks_url, userpool.kid)
+        await key_store.get_key(hot.jwks_url, hot.kid)
+
+    asyncio.run(get_keys())
+    assert key_store.stats["pools"] == 10
+    assert key_store.stats["evictions"] == 20
+    hot_stats = key_store.pool_stats(userpools[0].jwks_url)
+    assert (hot_stats["lookups"], hot_stats["fetches"]) == (7, 1)
+    assert hot_stats["size"] > 0
+    assert key_store.pool_stats(userpools[1].jwks_url)["evictions"] == 1
+
+
+
+def test_lfu_eviction_ages_lookups():
+    userpools = [
+        FakeUserpool(userpool_id=f"{tokens.USERPOOL_ID}{i}") for i in range(3)
+    ]
+    key_store = KeyStore(max_pools=2, eviction="lfu")
+    old, recent, new = userpools
+
+    async def get_keys():
+        for userpool in userpools:
+            key_store.register_source(
+                userpool.jwks_url, lambda pool=userpool: pool.jwks["keys"]
+            )
+        for _ in range(9):
+            await key_store.get_key(old.jwks_url, old.kid)
+        await key_store.get_key(recent.jwks_url, recent.kid)
+        await key_store.get_key(recent.jwks_url, recent.kid)
+        # each refresh halves lookups of old pool: 8 -> 4 -> 2 -> 1 -> 0
+        for _ in range(4):
+            await key_store.refresh(old.jwks_url)
+        await key_store.get_key(new.jwks_url, new.kid)
+
+    asyncio.run(get_keys())
+    assert key_store.get_key_set(old.jwks_url) is None
+    assert key_store.get_key_set(recent.jwks_url) is not None
+    # total lookups are still reported after eviction
+    assert key_store.pool_stats(old.jwks_url)["lookups"] == 9
+
+
+class JWKSHandler(BaseHTTPRequestHandler):
+    # keep-alive, so pooled connection is reused by next request
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = json.dumps(tokens.userpool.jwks).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_http_client_used_from_multiple_event_loops():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), JWKSHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    key_store = KeyStore()
+    try:
+        # each `asyncio.run` is a new event loop, e.g. Lambda invocation or
+        # request of `TestClient` used without context manager
+        for path in ("eu", "us"):
+            assert asyncio.run(key_store.get_key(
+                f"{base_url}/{path}/jwks.json", tokens.KID
+            )) is not None
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_stale_keys_served_during_background_refresh():
+    userpool = FakeUserpool()
+    key_store = CountingKeyStore(
+        max_age=10, refresh_before=5, min_refetch_interval=0
+    )
+    key_store.register_source(userpool.jwks_url, lambda: userpool.jwks["keys"])
+
+    async def get_keys():
+        # just before `max_age - refresh_before`, keys are fresh
+        key_store.load(
+            userpool.jwks_url, userpool.jwks["keys"],
+            fetched_at=time.time() - 4.9
+        )
+        await key_store.get_key(userpool.jwks_url, userpool.kid)
+        await asyncio.sleep(0.1)
+        assert key_store.fetches == 0
+
+        stale_key_set = key_store.load(
+            userpool.jwks_url, userpool.jwks["keys"],
+            fetched_at=time.time() - 5
+        )
+        # stale key is returned without waiting for refresh
+        key = await key_store.get_key(userpool.jwks_url, userpool.kid)
+        assert key is stale_key_set.get(userpool.kid)
+        await asyncio.sleep(0.1)
+        assert key_store.fetches == 1
+        assert key_store.get_key_set(userpool.jwks_url) is not stale_key_set
+        assert key_store.get_key_set(userpool.jwks_url).age < 1
+
+    asyncio.run(get_keys())
+
+
+def test_max_stale_limit():
+    userpool = FakeUserpool()
+    jwks = userpool.jwks["keys"]
+
+    def unavailable():
+        raise ConnectionError("JWKS endpoint is down.")
+
+    async def get_key(key_store, age):
+        key_store.register_source(userpool.jwks_url, unavailable)
+        key_store.load(userpool.jwks_url, jwks, fetched_at=time.time() - age)
+        key = await key_store.get_key(userpool.jwks_url, userpool.kid)
+        # let background refresh fail
+        await asyncio.sleep(0.01)
+        return key
+
+    # without `max_stale`, keys are served while refresh keeps failing
+    assert asyncio.run(get_key(KeyStore(max_age=1), age=3600)) is not None
+
+    key_store = KeyStore(max_age=1, refresh_before=0, max_stale=60)
+    assert asyncio.run(get_key(key_store, age=30)) is not None
+    with pytest.raises(CognitoJWTException) as error:
+        asyncio.run(get_key(key_store, age=61))
+    assert error.value.reason == "jwks_error"
@@ -0,0 +1,83 @@
+from fastapi import FastAPI, Depends, WebSocket
+from fastapi.testclient import TestClient
+
+from fastapi_cognito import CognitoAuthMiddleware, CognitoToken
+from utils import tokens
+from utils.factories import create_cognito
+
+
+def create_app(tmp_path, middleware: bool = True):
+    cognito = create_cognito(tmp_path)
+    app = FastAPI()
+    if middleware:
+        app.add_middleware(
+            CognitoAuthMiddleware, cognito=cognito, exclude_paths=["/health"]
+        )
+
+    async def username(auth: CognitoToken = Depends(cognito.auth_optional)):
+        return auth.username if auth else None
+
+    @app.get("/")
+    def hello_world(
+            auth: CognitoToken = Depends(cognito.auth_required),
+            name: str = Depends(username)
+    ):
+        return {"username": name}
+
+    @app.get("/health")
+    def health():
+        return {"status": "ok"}
+
+    @app.websocket("/ws")
+    async def ws(
+            websocket: WebSocket,
+            auth: CognitoToken = Depends(cognito.auth_required)
+    ):
+        await websocket.accept()
+        await websocket.send_json({"username": auth.username})
+        await websocket.close()
+
+    return cognito, TestClient(app=app)
+
+
+def test_token_decoded_once_per_request(tmp_path):
+    cognito, t_client = create_app(tmp_path, middleware=False)
+    token = tokens.generate_access_token()
+    resp = t_client.get("/", headers={"Authorization": f"Bearer {token}"})
+    assert resp.status_code == 200
+    assert resp.json() == {"username": "user1@test.com"}
+    assert cognito.decoded == 1
+
+
+def test_middleware_memoized_result(tmp_path):
+    cognito, t_client = create_app(tmp_path)
+    token = tokens.generate_access_token()
+    resp = t_client.get("/", headers={"Authorization": f"Bearer {token}"})
+    assert resp.status_code == 200
+    assert cognito.decoded == 1
+
+    resp = t_client.get("/")
+    assert resp.status_code == 401
+    assert resp.json() == {
+        "detail": "Request does not contain well-formed Cognito JWT"
+    }
+
+
+def test_middleware_excluded_path(tmp_path):
+    cognito, t_client = create_app(tmp_path)
+    token = tokens.generate_access_token()
+    resp = t_client.get(
+        "/health", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert resp.status_code == 200
+    assert cognito.decoded == 0
+
+
+def test_middleware_websocket(tmp_path):
+    cognito, t_client = create_app(tmp_path)
+    token = tokens.generate_access_token()
+    with t_client.websocket_connect(
+            "/ws", headers={"Authorization": f"Bearer {token}"}
+    ) as websocket:
+        assert websocket.receive_json() == {"username": "user1@test.com"}
+    assert cognito.decoded == 1
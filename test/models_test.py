@@ -0,0 +1,88 @@
+import pytest
+from fastapi import FastAPI, Depends
+from fastapi.testclient import TestClient
+
+from fastapi_cognito import CognitoAuth, CognitoClaims, TrustedCognitoClaims
+from fastapi_cognito.cognito_jwt.keys import KeyStore
+from fastapi_cognito.models import Claim, _validate_int
+from utils import tokens
+from utils.factories import create_settings
+
+
+class CustomClaims(CognitoClaims):
+    __slots__ = ()
+    custom_value = Claim(_validate_int, alias="custom:value", required=False)
+
+
+def access_claims(**claims):
+    return tokens.userpool.access_claims(**claims)
+
+
+def test_claims_validated_on_access():
+    claims = CognitoClaims(**access_claims(auth_time="yesterday"))
+
+    assert claims.username == "user1@test.com"
+    with pytest.raises(ValueError, match="auth_time"):
+        claims.auth_time
+    assert CognitoClaims(**access_claims(exp=10.0)).exp == 10
+    with pytest.raises(ValueError, match="iss"):
+        CognitoClaims(**access_claims(iss="not-a-url")).iss
+    with pytest.raises(ValueError, match="username"):
+        CognitoClaims(**access_claims(username=None)).username
+
+
+def test_trusted_claims_not_validated():
+    claims = TrustedCognitoClaims(**access_claims(auth_time="yesterday"))
+
+    assert claims.auth_time == "yesterday"
+    # missing required claim is still rejected
+    with pytest.raises(ValueError, match="username"):
+        TrustedCognitoClaims(**access_claims(username=None)).username
+
+
+def test_claim_aliases():
+    payload = access_claims(
+        scope="openid orders/read", **{"cognito:groups": ["admin", "staff"]}
+    )
+    claims = CognitoClaims(**payload)
+
+    assert claims.cognito_id == payload["sub"]
+    assert claims.cognito_groups == ["admin", "staff"]
+    assert claims.group_set == frozenset({"admin", "staff"})
+    assert claims.scope_set == frozenset({"openid", "orders/read"})
+    assert claims["cognito:groups"] == ["admin", "staff"]
+    assert claims.get("custom:value", 0) == 0
+    assert CognitoClaims(**access_claims()).cognito_groups is None
+
+
+def test_claim_subclass():
+    assert CustomClaims(**access_claims(**{"custom:value": 3})).custom_value \
+        == 3
+    assert CustomClaims(**access_claims()).custom_value is None
+    with pytest.raises(ValueError, match="custom:value"):
+        CustomClaims(**access_claims(**{"custom:value": "3"})).custom_value
+
+
+def test_invalid_claim_fails_in_handler(tmp_path):
+    cognito = CognitoAuth(
+        settings=create_settings(tmp_path),
+        key_store=KeyStore(),
+        custom_model=CognitoClaims
+    )
+    app = FastAPI()
+
+    @app.get("/username")
+    def username(auth: CognitoClaims = Depends(cognito.auth_required)):
+        return {"username": auth.username}
+
+    @app.get("/auth_time")
+    def auth_time(auth: CognitoClaims = Depends(cognito.auth_required)):
+        return {"auth_time": auth.auth_time}
+
+    t_client = TestClient(app=app, raise_server_exceptions=False)
+    token = tokens.generate_access_token(auth_time="yesterday")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    # token is authenticated, invalid claim fails only where it is accessed
+    assert t_client.get("/username", headers=headers).status_code == 200
+    assert t_client.get("/auth_time", headers=headers).status_code == 500
@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI, Depends
+from fastapi.exceptions import HTTPException
+from fastapi.testclient import TestClient
+
+from fastapi_cognito import CognitoAuth, CognitoMultiAuth, CognitoToken, \
+    SharedCache
+from fastapi_cognito.cognito_jwt.keys import KeyStore
+from fastapi_cognito.exceptions import CognitoAuthError
+from utils import tokens
+from utils.factories import authenticate, create_settings
+
+
+def create_client(tmp_path) -> TestClient:
+    settings = create_settings(tmp_path, {
+        f"pool{i}": {
+            "userpool_id": f"{tokens.USERPOOL_ID}{i}",
+            "app_client_id": f"{tokens.APP_CLIENT_ID}{i}"
+        }
+        for i in range(20)
+    })
+    cognito = CognitoMultiAuth(settings=settings, key_store=KeyStore())
+
+    app = FastAPI()
+
+    @app.get("/")
+    def hello_world(auth: CognitoToken = Depends(cognito.auth_required)):
+        return {"client_id": auth.client_id}
+
+    return TestClient(app=app)
+
+
+def issuer(i: int) -> str:
+    return (
+        f"https://cognito-idp.{tokens.REGION}.amazonaws.com/"
+        f"{tokens.USERPOOL_ID}{i}"
+    )
+
+
+def test_token_routed_by_issuer(tmp_path):
+    t_client = create_client(tmp_path)
+    token = tokens.generate_access_token(
+        iss=issuer(13), client_id=f"{tokens.APP_CLIENT_ID}13"
+    )
+    resp = t_client.get("/", headers={"Authorization": f"Bearer {token}"})
+    assert resp.status_code == 200
+    assert resp.json() == {"client_id": f"{tokens.APP_CLIENT_ID}13"}
+
+
+def test_token_for_other_userpool_client(tmp_path):
+    t_client = create_client(tmp_path)
+    token = tokens.generate_access_token(
+        iss=issuer(13), client_id=f"{tokens.APP_CLIENT_ID}7"
+    )
+    resp = t_client.get("/", headers={"Authorization": f"Bearer {token}"})
+    assert resp.status_code == 401
+
+
+def test_unknown_issuer(tmp_path):
+    t_client = create_client(tmp_path)
+    token = tokens.generate_access_token(iss="https://example.com/pool")
+    resp = t_client.get("/", headers={"Authorization": f"Bearer {token}"})
+    assert resp.status_code == 401
+
+
+@pytest.mark.parametrize("shared", [False, True])
+def test_invalid_issuer_type(tmp_path, shared):
+    shared_cache = SharedCache(str(tmp_path / "shared")) if shared else None
+    cognito = CognitoMultiAuth(
+        settings=create_settings(tmp_path),
+        key_store=KeyStore(),
+        shared_cache=shared_cache
+    )
+    with pytest.raises(HTTPException) as error:
+        authenticate(cognito, tokens.generate_access_token(iss=[]))
+    assert error.value.status_code == 401
+    assert error.value.detail == "Error decoding JWT token."
+
+
+def test_app_clients_of_same_userpool(tmp_path):
+    settings = create_settings(tmp_path, {
+        "web": {},
+        "mobile": {"app_client_id": ["mobile-client", "tablet-client"]}
+    })
+    cognito = CognitoMultiAuth(settings=settings, key_store=KeyStore())
+
+    for client_id in (tokens.APP_CLIENT_ID, "mobile-client", "tablet-client"):
+        token = tokens.generate_access_token(client_id=client_id)
+        assert authenticate(cognito, token).client_id == client_id
+    with pytest.raises(HTTPException):
+        authenticate(
+            cognito, tokens.generate_access_token(client_id="other-client")
+        )
+
+
+def test_same_issuer_with_different_jwks_rejected(tmp_path):
+    settings = create_settings(tmp_path, {
+        "web": {},
+        "mobile": {"jwks_url": str(tmp_path / "other.json")}
+    })
+    with pytest.raises(CognitoAuthError):
+        CognitoMultiAuth(settings=settings, key_store=KeyStore())
+
+
+def test_warmup_only_accepted_userpools(tmp_path):
+    settings = create_settings(tmp_path, {
+        f"pool{i}": {
+            "userpool_id": f"{tokens.USERPOOL_ID}{i}",
+            "jwks_url": tokens.write_jwks(tmp_path / f"jwks{i}.json")
+        }
+        for i in range(3)
+    })
+    jwks_urls = [str(tmp_path / f"jwks{i}.json") for i in range(3)]
+    multi_key_store, single_key_store = KeyStore(), KeyStore()
+    cognito_any = CognitoMultiAuth(
+        settings=settings,
+        userpool_names=["pool0", "pool2"],
+        key_store=multi_key_store
+    )
+    cognito = CognitoAuth(
+        settings=settings, userpool_name="pool1", key_store=single_key_store
+    )
+
+    asyncio.run(cognito_any.warmup())
+    asyncio.run(cognito.warmup())
+    assert [
+        multi_key_store.get_key_set(url) is not None for url in jwks_urls
+    ] == [True, False, True]
+    assert [
+        single_key_store.get_key_set(url) is not None for url in jwks_urls
+    ] == [False, True, False]
@@ -0,0 +1,71 @@
+import uuid
+
+import pytest
+from fastapi.exceptions import HTTPException
+
+from fastapi_cognito import TokenCache
+from fastapi_cognito.cognito_jwt.revocation import RevocationList
+from utils import tokens
+from utils.factories import create_cognito, authenticate
+
+
+def test_revocation_list_lookup():
+    ids = [str(uuid.uuid4()) for _ in range(1000)]
+    revocation_list = RevocationList(ids[:500])
+    revocation_list.update(ids[500:])
+
+    assert len(revocation_list) == 1000
+    assert all(revoked_id in revocation_list for revoked_id in ids)
+    assert not any(str(uuid.uuid4()) in revocation_list for _ in range(1000))
+    assert revocation_list.is_revoked({"jti": "a", "origin_jti": ids[0]})
+    assert not revocation_list.is_revoked({"jti": "a"})
+
+
+def test_revocation_list_file_updates(tmp_path):
+    path = tmp_path / "revoked.txt"
+    path.write_text("first\nsecond\nthi")
+    revocation_list = RevocationList(path=str(path), poll_interval=0)
+    assert len(revocation_list) == 2
+
+    with open(path, "a") as file:
+        file.write("rd\n")
+    assert revocation_list.is_revoked({"jti": "third"})
+    assert len(revocation_list) == 3
+
+    # replaced file is read from start, IDs missing from it are dropped,
+    # IDs added with `add` are kept
+    revocation_list.add("added")
+    replacement = tmp_path / "revoked.txt.new"
+    replacement.write_text("fourth\n")
+    replacement.replace(path)
+    assert revocation_list.is_revoked({"jti": "fourth"})
+    assert not revocation_list.is_revoked({"jti": "first"})
+    assert revocation_list.is_revoked({"jti": "added"})
+    assert len(revocation_list) == 2
+
+    # truncated file drops all IDs read from it
+    path.write_text("")
+    assert not revocation_list.is_revoked({"jti": "fourth"})
+    assert len(revocation_list) == 1
+
+
+def test_revoked_token_rejected_after_cache_hit(tmp_path):
+    revocation_list = RevocationList()
+    cognito = create_cognito(
+        tmp_path,
+        token_cache=TokenCache(),
+        revocation_list=revocation_list
+    )
+    origin_jti = str(uuid.uuid4())
+    token = tokens.generate_access_token(origin_jti=origin_jti)
+    assert authenticate(cognito, token).origin_jti == origin_jti
+
+    revocation_list.add(origin_jti)
+    with pytest.raises(HTTPException) as error:
+        authenticate(cognito, token)
+    assert error.value.status_code == 401
+
+    other_token = tokens.generate_access_token(origin_jti=origin_jti)
+    with pytest.raises(HTTPException):
+        authenticate(cognito, other_token)
+    assert cognito.decoded == 2
@@ -0,0 +1,109 @@
+import asyncio
+import multiprocessing
+import os
+import stat
+import time
+
+import pytest
+from fastapi.exceptions import HTTPException
+
+from fastapi_cognito import SharedCache, TokenCache
+from utils import tokens
+from utils.factories import create_cognito, authenticate, CountingKeyStore
+
+
+def test_jwks_single_fetch_per_host(tmp_path):
+    jwks_url = tokens.write_jwks(tmp_path / "jwks.json")
+    directory = str(tmp_path / "shared")
+    # key stores with separate shared cache objects act as separate workers
+    workers = [
+        CountingKeyStore(shared_cache=SharedCache(directory))
+        for _ in range(4)
+    ]
+
+    async def get_keys():
+        await asyncio.gather(*(
+            key_store.get_key(jwks_url, tokens.KID) for key_store in workers
+        ))
+
+    asyncio.run(get_keys())
+    assert sum(key_store.fetches for key_store in workers) == 1
+
+
+def test_verified_token_shared_between_workers(tmp_path):
+    directory = str(tmp_path / "shared")
+    first = create_cognito(tmp_path, shared_cache=SharedCache(directory))
+    second = create_cognito(
+        tmp_path,
+        shared_cache=SharedCache(directory),
+        token_cache=TokenCache()
+    )
+    token = tokens.generate_access_token()
+
+    assert authenticate(first, token).username == "user1@test.com"
+    assert authenticate(second, token).username == "user1@test.com"
+    assert (first.decoded, second.decoded) == (1, 0)
+
+
+def _read_claims(directory, token, queue):
+    queue.put(SharedCache(directory).get_claims(token))
+
+
+def test_claims_visible_in_other_process(tmp_path):
+    directory = str(tmp_path / "shared")
+    token = tokens.generate_access_token()
+    claims = {"username": "user1@test.com", "exp": 2 ** 31}
+    SharedCache(directory).set_claims(token, claims, claims["exp"])
+
+    queue = multiprocessing.get_context("spawn").Queue()
+    process = multiprocessing.get_context("spawn").Process(
+        target=_read_claims, args=(directory, token, queue)
+    )
+    process.start()
+    process.join(30)
+    assert queue.get(timeout=5) == claims
+
+
+def test_claims_not_shared_between_userpools(tmp_path):
+    shared_cache = SharedCache(str(tmp_path / "shared"))
+    userpools = {
+        "eu": {},
+        "us": {"region": "us-east-1", "app_client_id": "us-client-id"}
+    }
+    cognito_eu = create_cognito(tmp_path, userpools, shared_cache=shared_cache)
+    cognito_us = create_cognito(
+        tmp_path, userpools, userpool_name="us", shared_cache=shared_cache
+    )
+    token = tokens.generate_access_token()
+
+    assert authenticate(cognito_eu, token).username == "user1@test.com"
+    with pytest.raises(HTTPException) as error:
+        authenticate(cognito_us, token)
+    assert error.value.status_code == 401
+    assert cognito_us.decoded == 1
+
+
+def test_tokens_file_size_mismatch_rejected(tmp_path):
+    directory = str(tmp_path / "shared")
+    SharedCache(directory, max_entries=16)
+    with pytest.raises(ValueError):
+        SharedCache(directory, max_entries=32)
+
+
+def test_private_directory_required(tmp_path, monkeypatch):
+    directory = tmp_path / "shared"
+    shared_cache = SharedCache(str(directory))
+    shared_cache.set_jwks(tokens.userpool.jwks_url, tokens.userpool.jwks["keys"], 0)
+    shared_cache.set_claims("token", {"sub": "a"}, time.time() + 60)
+    assert stat.S_IMODE(directory.stat().st_mode) == 0o700
+    assert {
+        stat.S_IMODE(path.stat().st_mode) for path in directory.iterdir()
+    } == {0o600}
+
+    directory.chmod(0o777)
+    with pytest.raises(PermissionError):
+        SharedCache(str(directory))
+    directory.chmod(0o700)
+    monkeypatch.setattr(os, "getuid", lambda: directory.stat().st_uid + 1)
+    with pytest.raises(PermissionError):
+        SharedCache(str(directory))
@@ -0,0 +1,43 @@
+import asyncio
+
+from fastapi_cognito.cognito_jwt.decode import decode_cognito_jwt
+from fastapi_cognito.cognito_jwt.keys import KeyStore
+from fastapi_cognito.testing import FakeUserpool
+
+
+def decode(userpool: FakeUserpool, key_store: KeyStore, token: str):
+    return asyncio.run(decode_cognito_jwt(
+        token=token,
+        region=userpool.region,
+        userpool_id=userpool.userpool_id,
+        app_client_id=userpool.app_client_id,
+        jwks_url=userpool.jwks_url,
+        key_store=key_store
+    ))
+
+
+def test_in_memory_jwks_and_key_rotation():
+    userpool = FakeUserpool(userpool_id="eu-central-1_fake")
+    key_store = KeyStore()
+    userpool.register(key_store)
+
+    old_token = userpool.access_token(username="old")
+    old_kid = userpool.kid
+    assert userpool.rotate_key() != old_kid
+    assert decode(userpool, key_store, userpool.access_token())["iss"] == \
+        userpool.issuer
+    assert decode(userpool, key_store, old_token)["username"] == "old"
+
+    id_claims = decode(userpool, key_store, userpool.id_token())
+    assert id_claims["token_use"] == "id"
+    assert id_claims["aud"] == userpool.app_client_id
+
+
+def test_batch_minting():
+    userpool = FakeUserpool()
+    key_store = KeyStore()
+    userpool.register(key_store)
+
+    tokens = userpool.access_tokens(20, workers=2, scope="orders/read")
+    assert len(set(tokens)) == 20
+    assert decode(userpool, key_store, tokens[-1])["scope"] == "orders/read"
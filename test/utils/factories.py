@@ -0,0 +1,74 @@
+import asyncio
+from typing import Any, Dict, Optional
+
+from starlette.requests import Request
+
+from fastapi_cognito import CognitoAuth, CognitoSettings
+from fastapi_cognito.cognito_jwt.keys import KeyStore
+from utils import tokens
+
+
+class CountingCognitoAuth(CognitoAuth):
+    decoded = 0
+
+    async def _decode_token(self, token):
+        self.decoded += 1
+        return await super()._decode_token(token)
+
+
+class CountingKeyStore(KeyStore):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.fetches = 0
+
+    async def _fetch_keys(self, keys_url):
+        self.fetches += 1
+        # slow JWKS endpoint, all requests arrive before it responds
+        await asyncio.sleep(0.05)
+        return await super()._fetch_keys(keys_url)
+
+
+def create_settings(
+        tmp_path,
+        userpools: Optional[Dict[str, Dict[str, Any]]] = None,
+        check_expiration: bool = True
+) -> CognitoSettings:
+    """
+    Settings with userpools which read JWKS of test userpool from file,
+    values in `userpools` override default userpool configuration.
+    """
+    default = {
+        "region": tokens.REGION,
+        "userpool_id": tokens.USERPOOL_ID,
+        "app_client_id": tokens.APP_CLIENT_ID,
+        "jwks_url": tokens.write_jwks(tmp_path / "jwks.json")
+    }
+    return CognitoSettings(
+        check_expiration=check_expiration,
+        jwt_header_prefix="Bearer",
+        jwt_header_name="Authorization",
+        userpools={
+            name: dict(default, **config)
+            for name, config in (userpools or {"eu": {}}).items()
+        }
+    )
+
+
+def create_cognito(
+        tmp_path,
+        userpools: Optional[Dict[str, Dict[str, Any]]] = None,
+        **kwargs
+) -> CountingCognitoAuth:
+    return CountingCognitoAuth(
+        settings=create_settings(tmp_path, userpools),
+        key_store=KeyStore(),
+        **kwargs
+    )
+
+
+def authenticate(cognito: CognitoAuth, token: str):
+    request = Request({
+        "type": "http",
+        "headers": [(b"authorization", f"Bearer {token}".encode())],
+    })
+    return asyncio.run(cognito.auth_required(request))
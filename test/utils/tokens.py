@@ -0,0 +1,23 @@
+from typing import Any
+
+from fastapi_cognito.testing import FakeUserpool
+
+REGION = "eu-central-1"
+USERPOOL_ID = "eu-central-1_test"
+APP_CLIENT_ID = "test-client-id"
+KID = "test-kid"
+
+userpool = FakeUserpool(
+    region=REGION,
+    userpool_id=USERPOOL_ID,
+    app_client_id=APP_CLIENT_ID,
+    kid=KID
+)
+
+
+def write_jwks(path: str) -> str:
+    return userpool.write_jwks(path)
+
+
+def generate_access_token(**claims: Any) -> str:
+    return userpool.access_token(**claims)
@@ -0,0 +1,111 @@
+import time
+
+import pytest
+from fastapi import FastAPI, WebSocket
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from fastapi_cognito import CognitoAuth, WebSocketSessions
+from fastapi_cognito.cognito_jwt.keys import KeyStore
+from utils import tokens
+from utils.factories import create_settings
+
+SUB = "8f3b4c1e-5d6a-4b7c-9e8f-0a1b2c3d4e5f"
+
+
+def create_app(tmp_path, check_expiration=True, **kwargs):
+    cognito = CognitoAuth(
+        settings=create_settings(tmp_path, check_expiration=check_expiration),
+        key_store=KeyStore()
+    )
+    sessions = WebSocketSessions(cognito, **kwargs)
+    app = FastAPI()
+
+    @app.websocket("/ws")
+    async def ws(websocket: WebSocket):
+        auth = await sessions.connect(websocket)
+        if auth is None:
+            return
+        try:
+            while True:
+                message = await websocket.receive_json()
+                if await sessions.handle_message(websocket, message):
+                    if sessions.token_model(websocket) is None:
+                        return
+                    continue
+                await websocket.send_json(
+                    {"username": sessions.token_model(websocket).username}
+                )
+        except WebSocketDisconnect:
+            sessions.disconnect(websocket)
+
+    return sessions, TestClient(app=app)
+
+
+def connect(t_client, token):
+    return t_client.websocket_connect(
+        "/ws", headers={"Authorization": f"Bearer {token}"}
+    )
+
+
+def test_websocket_closed_on_expiration(tmp_path):
+    sessions, t_client = create_app(tmp_path)
+    token = tokens.generate_access_token(exp=int(time.time()) + 1)
+    with connect(t_client, token) as websocket:
+        websocket.send_json({"type": "echo"})
+        assert websocket.receive_json() == {"username": "user1@test.com"}
+        with pytest.raises(WebSocketDisconnect) as error:
+            websocket.receive_json()
+        assert error.value.code == 1008
+    assert len(sessions) == 0
+
+
+def test_websocket_expiration_follows_cognito_settings(tmp_path):
+    sessions, t_client = create_app(tmp_path, check_expiration=False)
+    token = tokens.generate_access_token(exp=int(time.time()) + 1)
+    with connect(t_client, token) as websocket:
+        time.sleep(1.5)
+        websocket.send_json({"type": "echo"})
+        assert websocket.receive_json() == {"username": "user1@test.com"}
+    assert len(sessions) == 0
+
+
+def test_websocket_refresh_and_challenge(tmp_path):
+    sessions, t_client = create_app(tmp_path, challenge_before=1800)
+    token = tokens.generate_access_token(sub=SUB, exp=int(time.time()) + 1)
+    with connect(t_client, token) as websocket:
+        assert websocket.receive_json()["type"] == "token_expiring"
+        new_exp = int(time.time()) + 3600
+        websocket.send_json({
+            "type": "refresh_token",
+            "token": tokens.generate_access_token(sub=SUB, exp=new_exp)
+        })
+        assert websocket.receive_json() == {
+            "type": "token_refreshed", "exp": new_exp
+        }
+        time.sleep(1.1)
+        websocket.send_json({"type": "echo"})
+        assert websocket.receive_json() == {"username": "user1@test.com"}
+
+
+
+def test_websocket_refresh_with_other_user_rejected(tmp_path):
+    sessions, t_client = create_app(tmp_path)
+    token = tokens.generate_access_token(sub=SUB)
+    with connect(t_client, token) as websocket:
+        websocket.send_json({
+            "type": "refresh_token",
+            "token": tokens.generate_access_token(sub="other-user")
+        })
+        with pytest.raises(WebSocketDisconnect) as error:
+            websocket.receive_json()
+        assert error.value.code == 1008
+    assert len(sessions) == 0
+
+def test_websocket_invalid_token_rejected(tmp_path):
+    sessions, t_client = create_app(tmp_path)
+    token = tokens.generate_access_token(client_id="other-client")
+    with pytest.raises(WebSocketDisconnect) as error:
+        with connect(t_client, token):
+            pass
+    assert error.value.code == 1008